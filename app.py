@@ -3,47 +3,287 @@ Cash Flow Optimizer + Savings Tracker
 Main Flask application
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g, has_request_context, url_for
+from flask.json.provider import JSONProvider
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from flask_caching import Cache
+from sqlalchemy import event, func, case, literal, select, insert, update, and_, true
+from sqlalchemy.orm import joinedload, column_property, validates
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import List, Dict, Optional
-from functools import wraps
+from functools import wraps, lru_cache
 from dotenv import load_dotenv
+import calendar
+import decimal
+import orjson
 import os
+import queue
+import sqlite3
+import time
+import uuid
 
-load_dotenv()
 
-app = Flask(__name__)
+@lru_cache(maxsize=1)
+def _load_env():
+    """Parse .env once per process; skipped when Gunicorn already loaded it pre-fork"""
+    if not os.environ.get('FLASK_ENV_LOADED'):
+        load_dotenv()
+        os.environ['FLASK_ENV_LOADED'] = '1'
+    return True
+
+
+_load_env()
+
+
+class OrjsonProvider(JSONProvider):
+    """jsonify()/request.json backed by orjson: faster, bytes out, dates as ISO strings"""
+    # Same key order as Flask's default provider; numpy scalars come back from the RAG vector store
+    OPTIONS = orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    @staticmethod
+    def _default(obj):
+        """Types orjson doesn't serialize natively but Flask's default provider did"""
+        if isinstance(obj, decimal.Decimal):
+            return str(obj)
+        raise TypeError(f'Object of type {type(obj).__name__} is not JSON serializable')
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self._default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj, default=self._default, option=self.OPTIONS), mimetype='application/json')
+
+
+# CASHFLOW_INSTANCE_PATH points the app at another instance folder (database and
+# response cache), e.g. a temporary one for test_query_budget.py
+app = Flask(__name__, instance_path=os.getenv('CASHFLOW_INSTANCE_PATH'))
+app.json = OrjsonProvider(app)
 
 # SQLite configuration for concurrent connections
-# check_same_thread=False allows multiple Gunicorn workers to use the DB
+# check_same_thread=False lets pooled connections move between worker threads
 # timeout=30 prevents "database is locked" errors under load
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///cashflow.db?check_same_thread=False&timeout=30'
+SQLITE_CONNECT_ARGS = {'check_same_thread': False, 'timeout': 30}
+app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///cashflow.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = os.urandom(24)
+# Every Gunicorn worker must sign sessions with the same key, so it comes from .env
+if not os.getenv('SECRET_KEY'):
+    raise RuntimeError('SECRET_KEY is not set. Add SECRET_KEY=<random string> to .env')
+app.config['SECRET_KEY'] = os.environ['SECRET_KEY'].encode()
 
 # SQLAlchemy pool configuration for concurrency
+# WAL lets many readers run next to a single writer, so the default (writer)
+# engine keeps ONE connection per process: concurrent writes queue on the pool
+# instead of racing for SQLite's write lock and failing with SQLITE_BUSY.
+# Read-only endpoints (@read_only_db) are served from the 'read' bind.
+# Endpoints that wait on the LLM or the embedding model must not hold the writer
+# while they wait (Gunicorn runs several threads per worker): they read through
+# @read_only_db and close the session before the slow call.
+# No pool_pre_ping/pool_recycle: a local SQLite file connection never goes stale.
 app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_pre_ping': True,  # Verify connections before use
-    'pool_recycle': 300,    # Recycle connections every 5 minutes
+    'pool_size': 1,         # Single writer connection
+    'max_overflow': 0,
+    'pool_timeout': 30,     # Wait up to 30s for the writer
+    'connect_args': SQLITE_CONNECT_ARGS,
+}
+app.config['SQLALCHEMY_BINDS'] = {
+    'read': {
+        'url': 'sqlite:///file:cashflow.db?mode=ro&uri=true',
+        'pool_size': 16,
+        'connect_args': SQLITE_CONNECT_ARGS,
+    }
 }
 
-db = SQLAlchemy(app)
+# Response cache for read-heavy endpoints (see dashboard_data). Stored on disk so a
+# write handled by one Gunicorn worker invalidates the entry for all of them.
+app.config['CACHE_TYPE'] = 'FileSystemCache'
+app.config['CACHE_DIR'] = os.path.join(app.instance_path, 'cache')
+app.config['CACHE_DEFAULT_TIMEOUT'] = 30
+cache = Cache(app)
+
+
+class RoutingSession(Session):
+    """Session that sends the reads of @read_only_db requests to the 'read' bind"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        # Flushes (INSERT/UPDATE/DELETE) always go to the writer
+        if bind is None and not self._flushing and has_request_context() and g.get('read_only_db'):
+            return self._db.engines['read']
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+
+
+def read_only_db(f):
+    """Decorator to serve an endpoint from the read-only connection pool"""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        g.read_only_db = True
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def locks_balances(f):
+    """Decorator for read-modify-write endpoints: take SQLite's write lock before the first read.
+
+    SQLite has no SELECT ... FOR UPDATE, and pysqlite only opens a transaction at the first
+    INSERT/UPDATE, so another Gunicorn worker could change a balance between our read and write.
+    BEGIN IMMEDIATE makes other writers wait (busy_timeout) until this request commits.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        db.session.execute(db.text('BEGIN IMMEDIATE'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+
+def dashboard_cache_key():
+    # Day-specific: days_until_payment and paycheck dates change at midnight
+    return f'dashboard/{request_today().isoformat()}'
+
+
+# POST endpoints whose writes don't touch cached data (recommend only saves a PurchaseRecommendation,
+# chat writes nothing)
+CACHE_PRESERVING_ENDPOINTS = {'recommend_card', 'chat_with_finances'}
+
+
+@app.after_request
+def invalidate_response_cache(response):
+    """Drop cached dashboard data after any request that may have written to the database"""
+    if request.method not in ('GET', 'HEAD', 'OPTIONS') and request.endpoint not in CACHE_PRESERVING_ENDPOINTS:
+        cache.delete(dashboard_cache_key())
+        cache.delete_memoized(liquidity_snapshot)
+        cache.delete_memoized(build_chat_context)
+    return response
+
+
+@app.before_request
+def init_request_caches():
+    """Per-request 'today' and memo for Card/IncomeSchedule.to_dict()"""
+    g.today = datetime.now().date()
+    g.card_dict_cache = {}
+    g.income_dict_cache = {}
+
+
+def request_today():
+    """Today's date, fixed for the whole request so every panel agrees near midnight"""
+    if has_request_context() and 'today' in g:
+        return g.today
+    return datetime.now().date()
+
+
+def request_cache(name):
+    """Return the per-request cache dict called name, or None outside a request"""
+    return g.get(name) if has_request_context() else None
+
+
+def get_account():
+    """The checking Account row, fetched at most once per request"""
+    if not has_request_context():
+        return Account.query.first()
+    if 'account' not in g:
+        g.account = Account.query.first()
+    return g.account
+
+
+@event.listens_for(RoutingSession, 'after_flush')
+def clear_card_dict_cache(session, flush_context):
+    """Expenses/payments written in this request change card balances"""
+    cache = request_cache('card_dict_cache')
+    if cache:
+        cache.clear()
 
 
 def enable_wal_mode():
     """Enable WAL mode for better concurrent read/write performance"""
+    # journal_mode is persistent in the database file; everything else is
+    # per connection and applied by set_sqlite_pragmas() below
     with app.app_context():
         db.session.execute(db.text('PRAGMA journal_mode=WAL'))
-        db.session.execute(db.text('PRAGMA synchronous=NORMAL'))
-        db.session.execute(db.text('PRAGMA busy_timeout=30000'))
         db.session.commit()
 
+
+@event.listens_for(Engine, 'connect')
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Tune every new pooled connection (these PRAGMAs reset per connection)"""
+    if not isinstance(dbapi_connection, sqlite3.Connection):
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA busy_timeout=30000')
+    cursor.execute('PRAGMA cache_size=-65536')        # 64 MB page cache
+    cursor.execute('PRAGMA temp_store=MEMORY')        # Keep temp B-trees/sorts off disk
+    cursor.execute('PRAGMA mmap_size=268435456')      # 256 MB memory-mapped I/O
+    cursor.execute('PRAGMA wal_autocheckpoint=1000')
+    cursor.execute('PRAGMA foreign_keys=ON')
+    cursor.close()
+
+
+# SQL statements each hot endpoint may run, enforced by test_query_budget.py. With
+# QUERY_BUDGET_CHECK=true every request also counts its statements and logs a warning
+# when an endpoint goes over its budget
+QUERY_BUDGETS = {
+    'get_expenses_this_month': 4,
+    'add_apple_pay_expense': 5,
+}
+
+if os.getenv('QUERY_BUDGET_CHECK', 'false').lower() == 'true':
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def count_request_query(conn, cursor, statement, parameters, context, executemany):
+        if has_request_context():
+            g.query_count = g.get('query_count', 0) + 1
+
+    @app.after_request
+    def check_query_budget(response):
+        budget = QUERY_BUDGETS.get(request.endpoint)
+        count = g.get('query_count', 0)
+        if budget is not None and count > budget:
+            app.logger.warning('%s ran %d SQL statements (budget %d)', request.endpoint, count, budget)
+        return response
+
 # ============================================================================
 # MODELS
 # ============================================================================
 
+# Spanish month names for display (index 1-12)
+MONTHS_ES = ('', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
+             'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre')
+
+
+def _shift_month(d, delta):
+    """Same day `delta` months away, capped at that month's last day (relativedelta semantics)"""
+    month = d.month - 1 + delta
+    year = d.year + month // 12
+    month = month % 12 + 1
+    return d.replace(year=year, month=month, day=min(d.day, calendar.monthrange(year, month)[1]))
+
+
+@lru_cache(maxsize=4096)
+def _valid_payment_date(cycle_close_date, payment_due_day):
+    """Payment date in the month after closing, capped at the month's last day (like Feb 30)"""
+    payment_month_date = _shift_month(cycle_close_date, 1)
+    payment_year = payment_month_date.year
+    payment_month = payment_month_date.month
+    
+    # Get the last valid day of the payment month
+    max_day = calendar.monthrange(payment_year, payment_month)[1]
+    
+    # Use the payment_due_day, but cap it at the max valid day
+    valid_day = min(payment_due_day, max_day)
+    
+    return datetime(payment_year, payment_month, valid_day).date()
+
+
 class Card(db.Model):
     """Credit card model"""
     id = db.Column(db.Integer, primary_key=True)
@@ -58,16 +298,18 @@ class Card(db.Model):
     manual_payment_date = db.Column(db.Date, nullable=True)  # Manual override for payment date
     apr = db.Column(db.Float, default=0.0)  # Annual Percentage Rate
     
+    # Billing cycle dates stored by refresh_cycle_dates() so to_dict() can skip the date math
+    previous_cycle_close_date = db.Column(db.Date, nullable=True)
+    cycle_close_date = db.Column(db.Date, nullable=True)
+    previous_payment_date_cached = db.Column(db.Date, nullable=True)
+    payment_date_cached = db.Column(db.Date, nullable=True)
+    cycle_version = db.Column(db.Integer, nullable=True)  # closing_day * 100 + payment_due_day
+    
     def __repr__(self):
         return f'<Card {self.name}>'
     
-    def to_dict(self):
-        from datetime import datetime
-        from dateutil.relativedelta import relativedelta
-        import calendar
-        
-        today = datetime.now().date()
-        
+    def _compute_cycle_dates(self, today):
+        """Close and automatic payment dates of the previous (closed) and current (open) billing cycles"""
         # Calculate billing cycles
         current_month = today.month
         current_year = today.year
@@ -77,38 +319,205 @@ class Card(db.Model):
             # We're AFTER closing day - in the NEW cycle
             # Previous cycle closed this month, current cycle closes next month
             previous_cycle_close = datetime(current_year, current_month, self.closing_day).date()
-            current_cycle_close = (datetime(current_year, current_month, self.closing_day) + relativedelta(months=1)).date()
+            current_cycle_close = _shift_month(datetime(current_year, current_month, self.closing_day).date(), 1)
         else:
             # We're BEFORE closing day - still in previous cycle
             # Previous cycle closed last month, current cycle closes this month
-            previous_cycle_close = (datetime(current_year, current_month, self.closing_day) - relativedelta(months=1)).date()
+            previous_cycle_close = _shift_month(datetime(current_year, current_month, self.closing_day).date(), -1)
             current_cycle_close = datetime(current_year, current_month, self.closing_day).date()
         
-        # Calculate payment dates - handle invalid days (like Feb 30)
         # Payment is on payment_due_day of the month AFTER closing
-        def get_valid_payment_date(cycle_close_date):
-            payment_month_date = cycle_close_date + relativedelta(months=1)
-            payment_year = payment_month_date.year
-            payment_month = payment_month_date.month
+        return (previous_cycle_close, current_cycle_close,
+                _valid_payment_date(previous_cycle_close, self.payment_due_day),
+                _valid_payment_date(current_cycle_close, self.payment_due_day))
+    
+    def _cycle_version(self):
+        # Stored cycle dates are only valid for the closing/payment days they were computed with
+        return self.closing_day * 100 + self.payment_due_day
+    
+    def _cycle_dates(self, today):
+        """Stored cycle dates while today is still inside that cycle, otherwise computed"""
+        if (self.cycle_close_date and self.cycle_version == self._cycle_version()
+                and self.previous_cycle_close_date < today <= self.cycle_close_date):
+            return (self.previous_cycle_close_date, self.cycle_close_date,
+                    self.previous_payment_date_cached, self.payment_date_cached)
+        return self._compute_cycle_dates(today)
+    
+    @classmethod
+    def refresh_cycle_dates(cls, today=None):
+        """Store the current billing cycle dates on every card (run daily, see `flask refresh-cycle-dates`)"""
+        today = today or datetime.now().date()
+        cards = cls.query.all()
+        for card in cards:
+            (card.previous_cycle_close_date, card.cycle_close_date,
+             card.previous_payment_date_cached, card.payment_date_cached) = card._compute_cycle_dates(today)
+            card.cycle_version = card._cycle_version()
+        db.session.commit()
+        return len(cards)
+    
+    def _dict_cache_key(self, today):
+        return (self.id, today, self.name, self.closing_day, self.payment_due_day, self.credit_limit,
+                self.current_balance, self.balance_is_closed, self.closed_balance, self.open_balance,
+                self.manual_payment_date, self.apr)
+    
+    def to_dict(self):
+        today = request_today()
+        
+        cache = request_cache('card_dict_cache')
+        cache_key = self._dict_cache_key(today)
+        if cache is not None and cache_key in cache:
+            return cache[cache_key]
+        
+        cycle_dates = self._cycle_dates(today)
+        previous_cycle_close, current_cycle_close = cycle_dates[:2]
+        
+        if self._uses_balance_fields():
+            # Balances come straight from the card; expense totals would be ignored
+            closed_expenses_total = open_expenses_total = total_paid = 0
+        else:
+            # Closed statement expenses (up to previous_cycle_close) and open statement
+            # expenses (after previous_cycle_close, up to current_cycle_close) in one pass
+            closed_expenses_total, open_expenses_total = db.session.query(
+                func.coalesce(func.sum(case(
+                    (VariableExpenseLog.expense_date <= previous_cycle_close, VariableExpenseLog.amount), else_=0
+                )), 0),
+                func.coalesce(func.sum(case(
+                    (VariableExpenseLog.expense_date > previous_cycle_close, VariableExpenseLog.amount), else_=0
+                )), 0)
+            ).filter(
+                VariableExpenseLog.card_id == self.id,
+                VariableExpenseLog.expense_date <= current_cycle_close
+            ).one()
             
-            # Get the last valid day of the payment month
-            max_day = calendar.monthrange(payment_year, payment_month)[1]
+            # Get payments made (one row per month instead of every payment)
+            total_paid = db.session.query(
+                func.coalesce(func.sum(CardPaymentTotal.total), 0)
+            ).filter(CardPaymentTotal.card_id == self.id).scalar()
+        
+        card_dict = self._to_dict_with_totals(
+            today, cycle_dates,
+            closed_expenses_total, open_expenses_total, total_paid
+        )
+        if cache is not None:
+            cache[cache_key] = card_dict
+        return card_dict
+    
+    @classmethod
+    def dashboard_payload(cls, cards):
+        """to_dict() for a list of cards using one GROUP BY query per table instead of 3 queries per card"""
+        if not cards:
+            return []
+        
+        today = request_today()
+        cycles = {c.id: c._cycle_dates(today) for c in cards}
+        
+        # Only cards without the closed/open balance fields need expense totals
+        totals_cycles = {c.id: cycles[c.id] for c in cards if not c._uses_balance_fields()}
+        expense_totals = {}
+        paid_totals = {}
+        
+        if totals_cycles:
+            # Per-card cycle close dates as CASE expressions over card_id (bound as
+            # plain dates, exactly like the date comparisons in to_dict)
+            previous_close = case(
+                {card_id: literal(closes[0], db.Date) for card_id, closes in totals_cycles.items()},
+                value=VariableExpenseLog.card_id
+            )
+            current_close = case(
+                {card_id: literal(closes[1], db.Date) for card_id, closes in totals_cycles.items()},
+                value=VariableExpenseLog.card_id
+            )
             
-            # Use the payment_due_day, but cap it at the max valid day
-            valid_day = min(self.payment_due_day, max_day)
+            expense_rows = db.session.query(
+                VariableExpenseLog.card_id,
+                func.sum(case((VariableExpenseLog.expense_date <= previous_close, VariableExpenseLog.amount), else_=0)),
+                func.sum(case((VariableExpenseLog.expense_date > previous_close, VariableExpenseLog.amount), else_=0))
+            ).filter(
+                VariableExpenseLog.card_id.in_(list(totals_cycles)),
+                VariableExpenseLog.expense_date <= current_close
+            ).group_by(VariableExpenseLog.card_id).all()
+            expense_totals = {card_id: (closed, open_) for card_id, closed, open_ in expense_rows}
             
-            return datetime(payment_year, payment_month, valid_day).date()
-        
-        # Calculate automatic payment dates
-        previous_payment_date_auto = get_valid_payment_date(previous_cycle_close)
-        current_payment_date_auto = get_valid_payment_date(current_cycle_close)
+            paid_totals = dict(db.session.query(
+                CardPaymentTotal.card_id, func.sum(CardPaymentTotal.total)
+            ).filter(
+                CardPaymentTotal.card_id.in_(list(totals_cycles))
+            ).group_by(CardPaymentTotal.card_id).all())
+        
+        cards_data = [
+            c._to_dict_with_totals(today, cycles[c.id], *expense_totals.get(c.id, (0, 0)), paid_totals.get(c.id, 0))
+            for c in cards
+        ]
+        
+        cache = request_cache('card_dict_cache')
+        if cache is not None:
+            for c, card_dict in zip(cards, cards_data):
+                cache[c._dict_cache_key(today)] = card_dict
+        return cards_data
+    
+    @classmethod
+    def closed_statements(cls, cards):
+        """
+        (balance, payment_date) of each card's closed statement, without building the open statement.
+        payment_date is None for balance-field cards with nothing due (their dates aren't computed).
+        """
+        # Cards on the balance fields need no totals; only the rest go through dashboard_payload
+        legacy_cards = [c for c in cards if not c._uses_balance_fields()]
+        legacy_closed = {
+            c.id: card_dict['closed_statement']
+            for c, card_dict in zip(legacy_cards, cls.dashboard_payload(legacy_cards))
+        }
         
+        statements = []
+        for c in cards:
+            if c.id in legacy_closed:
+                closed = legacy_closed[c.id]
+                statements.append((closed['balance'], closed['payment_date']))
+            elif c.closed_balance > 0:
+                statements.append((round(c.closed_balance, 2), c.closed_payment_date()))
+            else:
+                statements.append((round(c.closed_balance, 2), None))
+        return statements
+    
+    @classmethod
+    def statement_summaries(cls, cards):
+        """(closed balance, closed payment date, open balance, open close date) of each card, without to_dict()"""
+        # Same split as closed_statements: only cards without the balance fields need totals
+        legacy_cards = [c for c in cards if not c._uses_balance_fields()]
+        legacy_dicts = dict(zip((c.id for c in legacy_cards), cls.dashboard_payload(legacy_cards)))
+    
+        today = request_today()
+        summaries = []
+        for c in cards:
+            card_dict = legacy_dicts.get(c.id)
+            if card_dict is not None:
+                closed, open_ = card_dict['closed_statement'], card_dict['open_statement']
+                summaries.append((closed['balance'], closed['payment_date'], open_['balance'], open_['close_date']))
+            else:
+                cycle_dates = c._cycle_dates(today)
+                summaries.append((round(c.closed_balance, 2), c._closed_payment_date(cycle_dates),
+                                  round(c.open_balance, 2), cycle_dates[1]))
+        return summaries
+    
+    def closed_payment_date(self):
+        """Payment date of the closed statement as a date (same value as to_dict()['closed_statement'])"""
+        return self._closed_payment_date(self._cycle_dates(request_today()))
+    
+    def _closed_payment_date(self, cycle_dates):
         # Use manual payment date if set and balance is closed, otherwise use calculated
         if self.manual_payment_date and self.balance_is_closed:
-            previous_payment_date = self.manual_payment_date
-        else:
-            previous_payment_date = previous_payment_date_auto
+            return self.manual_payment_date
+        return cycle_dates[2]
+    
+    def _uses_balance_fields(self):
+        """New system: closed_balance/open_balance are set and take precedence over expenses"""
+        return self.closed_balance > 0 or self.open_balance > 0
+    
+    def _to_dict_with_totals(self, today, cycle_dates, closed_expenses_total, open_balance_from_expenses, total_paid):
+        (previous_cycle_close, current_cycle_close,
+         previous_payment_date_auto, current_payment_date_auto) = cycle_dates
         
+        previous_payment_date = self._closed_payment_date(cycle_dates)
         current_payment_date = current_payment_date_auto
         
         # Calculate days remaining
@@ -116,33 +525,12 @@ class Card(db.Model):
         days_until_current_close = (current_cycle_close - today).days
         days_until_current_payment = (current_payment_date - today).days
         
-        # Get expenses for CLOSED statement (before previous_cycle_close)
-        closed_expenses = VariableExpenseLog.query.filter(
-            VariableExpenseLog.card_id == self.id,
-            VariableExpenseLog.expense_date <= previous_cycle_close
-        ).all()
-        closed_expenses_total = sum(e.amount for e in closed_expenses)
-        
-        # Get payments made
-        payments = CardPayment.query.filter(
-            CardPayment.card_id == self.id
-        ).all()
-        total_paid = sum(p.amount for p in payments)
-        
         # Calculate closed balance from expenses
         closed_balance_from_expenses = closed_expenses_total - total_paid
         closed_balance_from_expenses = max(0, closed_balance_from_expenses)
         
-        # Get expenses for OPEN statement (after previous_cycle_close, before current_cycle_close)
-        open_expenses = VariableExpenseLog.query.filter(
-            VariableExpenseLog.card_id == self.id,
-            VariableExpenseLog.expense_date > previous_cycle_close,
-            VariableExpenseLog.expense_date <= current_cycle_close
-        ).all()
-        open_balance_from_expenses = sum(e.amount for e in open_expenses)
-        
         # Use new fields if set, otherwise fall back to calculated or legacy values
-        if self.closed_balance > 0 or self.open_balance > 0:
+        if self._uses_balance_fields():
             # New system: use separate fields directly
             closed_balance = self.closed_balance
             open_balance = self.open_balance
@@ -171,13 +559,13 @@ class Card(db.Model):
             'current_balance': round(total_balance, 2),  # Exactly 2 decimals
             'utilization': round((total_balance / self.credit_limit * 100), 2) if self.credit_limit > 0 else 0,
             'apr': self.apr,
-            'manual_payment_date': self.manual_payment_date.isoformat() if self.manual_payment_date else None,
+            'manual_payment_date': self.manual_payment_date,
             
             # Closed statement (previous billing cycle)
             'closed_statement': {
                 'balance': round(closed_balance, 2),  # Exactly 2 decimals
-                'close_date': previous_cycle_close.isoformat(),
-                'payment_date': previous_payment_date.isoformat(),
+                'close_date': previous_cycle_close,
+                'payment_date': previous_payment_date,
                 'days_until_payment': days_until_previous_payment,
                 'status': 'PAID' if closed_balance == 0 else 'PENDING',
                 'has_manual_date': bool(self.manual_payment_date and self.balance_is_closed)
@@ -186,9 +574,9 @@ class Card(db.Model):
             # Open statement (current billing cycle)
             'open_statement': {
                 'balance': round(open_balance, 2),  # Exactly 2 decimals
-                'close_date': current_cycle_close.isoformat(),
+                'close_date': current_cycle_close,
                 'days_until_close': days_until_current_close,
-                'payment_date': current_payment_date.isoformat(),
+                'payment_date': current_payment_date,
                 'days_until_payment': days_until_current_payment
             }
         }
@@ -224,7 +612,8 @@ class Account(db.Model):
     """Checking account model"""
     id = db.Column(db.Integer, primary_key=True)
     balance = db.Column(db.Float, nullable=False)
-    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    # Bumped by every UPDATE of the row (ORM or Core); handlers only set it for touch-only updates
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Account balance=${self.balance}>'
@@ -235,7 +624,7 @@ class SavingsAccount(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     balance = db.Column(db.Float, nullable=False)
     target = db.Column(db.Float, nullable=False)
-    last_updated = db.Column(db.DateTime, default=datetime.utcnow)
+    last_updated = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     def __repr__(self):
         return f'<Savings ${self.balance}/${self.target}>'
@@ -261,11 +650,14 @@ class IncomeSchedule(db.Model):
         return f'<Income ${self.amount} on days {self.first_paycheck_day} and {self.second_paycheck_day}>'
     
     def to_dict(self):
-        from datetime import datetime
-        from dateutil.relativedelta import relativedelta
-        import calendar
+        today = request_today()
+        
+        # Output depends only on these fields and today's date
+        cache = request_cache('income_dict_cache')
+        cache_key = (self.id, today, self.amount, self.first_paycheck_day, self.second_paycheck_day)
+        if cache is not None and cache_key in cache:
+            return cache[cache_key]
         
-        today = datetime.now().date()
         current_day = today.day
         current_month = today.month
         current_year = today.year
@@ -275,39 +667,31 @@ class IncomeSchedule(db.Model):
         next_paycheck_date = None
         next_paycheck_amount = self.amount
         
-        # Check both paycheck days this month
+        # Check both paycheck days this month, skipping days the month
+        # doesn't have (e.g., Feb 30)
+        max_day = calendar.monthrange(current_year, current_month)[1]
         for day in paycheck_days:
-            try:
-                paycheck_date = datetime(current_year, current_month, day).date()
-                if paycheck_date >= today:
-                    next_paycheck_date = paycheck_date
-                    break
-            except ValueError:
-                # Invalid day for this month (e.g., Feb 30)
-                continue
+            if current_day <= day <= max_day:
+                next_paycheck_date = datetime(current_year, current_month, day).date()
+                break
         
         # If no paycheck found this month, check next month
         if not next_paycheck_date:
-            next_month = today + relativedelta(months=1)
+            next_month = _shift_month(today, 1)
+            max_day = calendar.monthrange(next_month.year, next_month.month)[1]
             for day in paycheck_days:
-                try:
-                    paycheck_date = datetime(next_month.year, next_month.month, day).date()
-                    next_paycheck_date = paycheck_date
+                if 1 <= day <= max_day:
+                    next_paycheck_date = datetime(next_month.year, next_month.month, day).date()
                     break
-                except ValueError:
-                    continue
         
         # Format date in Spanish
-        months_es = ['', 'Enero', 'Febrero', 'Marzo', 'Abril', 'Mayo', 'Junio',
-                     'Julio', 'Agosto', 'Septiembre', 'Octubre', 'Noviembre', 'Diciembre']
-        
         next_paycheck_formatted = None
         days_until = None
         if next_paycheck_date:
-            next_paycheck_formatted = f"{next_paycheck_date.day} de {months_es[next_paycheck_date.month]}"
+            next_paycheck_formatted = f"{next_paycheck_date.day} de {MONTHS_ES[next_paycheck_date.month]}"
             days_until = (next_paycheck_date - today).days
         
-        return {
+        income_dict = {
             'amount': self.amount,
             'first_paycheck_day': self.first_paycheck_day,
             'second_paycheck_day': self.second_paycheck_day,
@@ -315,6 +699,9 @@ class IncomeSchedule(db.Model):
             'next_paycheck_formatted': next_paycheck_formatted,
             'days_until_paycheck': days_until
         }
+        if cache is not None:
+            cache[cache_key] = income_dict
+        return income_dict
 
 
 class FixedExpense(db.Model):
@@ -329,6 +716,23 @@ class FixedExpense(db.Model):
     def __repr__(self):
         return f'<FixedExpense {self.name} ${self.amount}>'
     
+    @classmethod
+    def unpaid_in(cls, month, year):
+        """SQL filter: active expenses with no ExpensePayment for month/year (NOT EXISTS anti-join)"""
+        paid = select(ExpensePayment.id).where(
+            ExpensePayment.expense_id == cls.id,
+            ExpensePayment.month == month,
+            ExpensePayment.year == year
+        ).exists()
+        return and_(cls.active == True, ~paid)
+    
+    @classmethod
+    def active_total(cls):
+        """Sum of all active fixed expenses, computed in SQL"""
+        return db.session.execute(
+            select(func.coalesce(func.sum(cls.amount), 0.0)).where(cls.active == True)
+        ).scalar_one()
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -397,8 +801,8 @@ class PurchaseRecommendation(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     executed_at = db.Column(db.DateTime, nullable=True)
     
-    # Relationship
-    card = db.relationship('Card', backref='recommendations')
+    # Relationship (joined: every use of a recommendation needs its card)
+    card = db.relationship('Card', backref='recommendations', lazy='joined')
     
     def __repr__(self):
         return f'<PurchaseRecommendation ${self.amount} on {self.card.name}>'
@@ -422,6 +826,28 @@ class PurchaseRecommendation(db.Model):
             'created_at': self.created_at.isoformat(),
             'executed_at': self.executed_at.isoformat() if self.executed_at else None
         }
+    
+    @classmethod
+    def to_dict_from_row(cls, row):
+        """to_dict() for a Core row that carries card_name from an outer join on Card"""
+        return {
+            'id': row.id,
+            'amount': round(row.amount, 2),
+            'purchase_date': row.purchase_date.isoformat(),
+            'is_deferred': row.is_deferred,
+            'num_payments': row.num_payments,
+            'payment_frequency': row.payment_frequency,
+            'payment_amount': round(row.payment_amount, 2) if row.payment_amount else None,
+            'recommended_card_id': row.recommended_card_id,
+            'recommended_card_name': row.card_name,
+            'can_afford_now': row.can_afford_now,
+            'liquidity_status': row.liquidity_status,
+            'suggested_wait_date': row.suggested_wait_date.isoformat() if row.suggested_wait_date else None,
+            'status': row.status,
+            'description': row.description,
+            'created_at': row.created_at.isoformat(),
+            'executed_at': row.executed_at.isoformat() if row.executed_at else None
+        }
 
 
 class DeferredPaymentSchedule(db.Model):
@@ -435,7 +861,10 @@ class DeferredPaymentSchedule(db.Model):
     status = db.Column(db.String(20), default='pending')  # pending/paid
     
     # Relationship
-    recommendation = db.relationship('PurchaseRecommendation', backref='payment_schedule')
+    recommendation = db.relationship(
+        'PurchaseRecommendation',
+        backref=db.backref('payment_schedule', order_by='DeferredPaymentSchedule.payment_number')
+    )
     
     def __repr__(self):
         return f'<DeferredPayment #{self.payment_number} ${self.payment_amount}>'
@@ -450,6 +879,19 @@ class DeferredPaymentSchedule(db.Model):
             'card_statement_close_date': self.card_statement_close_date.isoformat(),
             'status': self.status
         }
+    
+    @classmethod
+    def to_dict_from_row(cls, row):
+        """to_dict() for a Core row with the same columns"""
+        return {
+            'id': row.id,
+            'recommendation_id': row.recommendation_id,
+            'payment_number': row.payment_number,
+            'payment_amount': round(row.payment_amount, 2),
+            'expected_date': row.expected_date.isoformat(),
+            'card_statement_close_date': row.card_statement_close_date.isoformat(),
+            'status': row.status
+        }
 
 
 class ExpensePayment(db.Model):
@@ -464,6 +906,13 @@ class ExpensePayment(db.Model):
     
     expense = db.relationship('FixedExpense', backref='payments')
     
+    # One payment per expense and month; also serves the "paid this month?" lookups.
+    # year/month alone serves the "everything paid this month" lists and totals.
+    __table_args__ = (
+        db.Index('ix_expensepayment_expense_year_month', 'expense_id', 'year', 'month', unique=True),
+        db.Index('ix_expensepayment_year_month', 'year', 'month'),
+    )
+    
     def __repr__(self):
         return f'<ExpensePayment {self.expense.name if self.expense else "Unknown"} ${self.amount}>'
     
@@ -506,9 +955,17 @@ class VariableExpenseLog(db.Model):
     description = db.Column(db.String(200))
     expense_date = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
     card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=True)  # Puede ser efectivo
+    # Client-supplied key so a retried Apple Pay request is only recorded once
+    idempotency_key = db.Column(db.String(100), unique=True, index=True)
     
     card = db.relationship('Card', backref='variable_expenses')
     
+    # Card balances filter by card + expense_date range; monthly lists/totals by date alone
+    __table_args__ = (
+        db.Index('ix_vel_card_expense_date', 'card_id', 'expense_date'),
+        db.Index('ix_vel_expense_date', 'expense_date'),
+    )
+    
     def __repr__(self):
         return f'<VariableExpense {self.category} ${self.amount}>'
     
@@ -522,18 +979,40 @@ class VariableExpenseLog(db.Model):
             'card_id': self.card_id,
             'card_name': self.card.name if self.card else 'Efectivo'
         }
+    
+    @classmethod
+    def to_dict_from_row(cls, row):
+        """to_dict() for a Core row that carries card_name from an outer join on Card"""
+        return {
+            'id': row.id,
+            'category': row.category,
+            'amount': row.amount,
+            'description': row.description,
+            'expense_date': row.expense_date.isoformat(),
+            'card_id': row.card_id,
+            'card_name': row.card_name or 'Efectivo'
+        }
 
 
 class CardPayment(db.Model):
     """Track credit card payments from checking account"""
     id = db.Column(db.Integer, primary_key=True)
-    card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    payment_date = db.Column(db.DateTime, nullable=False)
+    # active_history: updates need the old values to move them out of CardPaymentTotal
+    card_id = column_property(db.Column(db.Integer, db.ForeignKey('card.id'), nullable=False), active_history=True)
+    amount = column_property(db.Column(db.Float, nullable=False), active_history=True)
+    payment_date = column_property(db.Column(db.DateTime, nullable=False), active_history=True)
     notes = db.Column(db.String(200))
+    # Client-supplied key so a retried payment is only applied once
+    idempotency_key = db.Column(db.String(100), unique=True, index=True)
     
     card = db.relationship('Card', backref='payments')
     
+    # Per-card totals by card + payment_date range; monthly lists/totals by date alone
+    __table_args__ = (
+        db.Index('ix_cp_card_payment_date', 'card_id', 'payment_date'),
+        db.Index('ix_cp_payment_date', 'payment_date'),
+    )
+    
     def __repr__(self):
         return f'<CardPayment {self.card.name if self.card else "Unknown"} ${self.amount}>'
     
@@ -546,17 +1025,116 @@ class CardPayment(db.Model):
             'payment_date': self.payment_date.isoformat(),
             'notes': self.notes
         }
+    
+    @classmethod
+    def to_dict_from_row(cls, row):
+        """to_dict() for a Core row that carries card_name from an outer join on Card"""
+        return {
+            'id': row.id,
+            'card_id': row.card_id,
+            'card_name': row.card_name,
+            'amount': row.amount,
+            'payment_date': row.payment_date.isoformat(),
+            'notes': row.notes
+        }
+
+
+class CardPaymentTotal(db.Model):
+    """Running card payment totals per month, kept in sync with CardPayment by mapper events"""
+    card_id = db.Column(db.Integer, primary_key=True)
+    year = db.Column(db.Integer, primary_key=True)
+    month = db.Column(db.Integer, primary_key=True)
+    total = db.Column(db.Float, nullable=False, default=0.0)
+    
+    def __repr__(self):
+        return f'<CardPaymentTotal card={self.card_id} {self.month}/{self.year} ${self.total}>'
+    
+    @classmethod
+    def rebuild(cls):
+        """Recompute every total from the card_payment table"""
+        db.session.execute(cls.__table__.delete())
+        db.session.execute(cls.__table__.insert().from_select(
+            ['card_id', 'year', 'month', 'total'],
+            select(
+                CardPayment.card_id,
+                func.cast(func.strftime('%Y', CardPayment.payment_date), db.Integer),
+                func.cast(func.strftime('%m', CardPayment.payment_date), db.Integer),
+                func.sum(CardPayment.amount)
+            ).group_by(CardPayment.card_id, func.strftime('%Y-%m', CardPayment.payment_date))
+        ))
+        db.session.commit()
+    
+    @classmethod
+    def sync(cls):
+        """Rebuild the totals if they drifted from card_payment (new table, manual SQL edits)"""
+        payments_sum = db.session.query(func.coalesce(func.sum(CardPayment.amount), 0)).scalar()
+        totals_sum = db.session.query(func.coalesce(func.sum(cls.total), 0)).scalar()
+        if abs(payments_sum - totals_sum) > 0.005:
+            cls.rebuild()
+
+
+def _add_card_payment_total(connection, card_id, payment_date, amount):
+    table = CardPaymentTotal.__table__
+    stmt = sqlite_insert(table).values(
+        card_id=card_id, year=payment_date.year, month=payment_date.month, total=amount
+    )
+    connection.execute(stmt.on_conflict_do_update(
+        index_elements=['card_id', 'year', 'month'],
+        set_={'total': table.c.total + stmt.excluded.total}
+    ))
+
+
+@event.listens_for(CardPayment, 'after_insert')
+def card_payment_inserted(mapper, connection, target):
+    _add_card_payment_total(connection, target.card_id, target.payment_date, target.amount)
+
+
+@event.listens_for(CardPayment, 'after_update')
+def card_payment_updated(mapper, connection, target):
+    state = db.inspect(target)
+    
+    def previous(key):
+        history = state.attrs[key].history
+        return history.deleted[0] if history.deleted else getattr(target, key)
+    
+    _add_card_payment_total(connection, previous('card_id'), previous('payment_date'), -previous('amount'))
+    _add_card_payment_total(connection, target.card_id, target.payment_date, target.amount)
+
+
+@event.listens_for(CardPayment, 'after_delete')
+def card_payment_deleted(mapper, connection, target):
+    _add_card_payment_total(connection, target.card_id, target.payment_date, -target.amount)
 
 
 class CardAlias(db.Model):
     """Map Apple Pay card names to app card IDs"""
     id = db.Column(db.Integer, primary_key=True)
     apple_name = db.Column(db.String(100), nullable=False, unique=True)  # Name from Apple Pay
+    apple_name_lower = db.Column(db.String(100), nullable=False, unique=True, index=True)  # Set from apple_name
     card_id = db.Column(db.Integer, db.ForeignKey('card.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     card = db.relationship('Card', backref='aliases')
 
+    @validates('apple_name')
+    def _set_apple_name_lower(self, key, value):
+        # Case-insensitive lookups compare against this indexed copy
+        self.apple_name_lower = value.lower()
+        return value
+
+    @classmethod
+    def insert_if_new(cls, apple_name, card_id):
+        """INSERT ... ON CONFLICT DO NOTHING: the new alias, or None if the name already exists"""
+        # Core INSERT: no @validates, so apple_name_lower is set here, and no mapper events
+        alias = db.session.scalar(
+            sqlite_insert(cls).values(
+                apple_name=apple_name, apple_name_lower=apple_name.lower(), card_id=card_id
+            ).on_conflict_do_nothing().returning(cls)
+        )
+        if alias is not None:
+            _bump_card_lookup_generation(None, None, alias)
+        return alias
+
     def __repr__(self):
         return f'<CardAlias "{self.apple_name}" -> {self.card.name if self.card else "Unknown"}>'
 
@@ -586,6 +1164,11 @@ class PendingApplePayExpense(db.Model):
 
     resolved_card = db.relationship('Card', backref='resolved_pending_expenses')
 
+    # The review queue reads only pending rows newest first; resolved history stays out of the index
+    __table_args__ = (
+        db.Index('ix_pending_apple_pay_pending', 'created_at', sqlite_where=db.text("status = 'pending'")),
+    )
+
     def __repr__(self):
         return f'<PendingApplePayExpense "{self.apple_card_name}" ${self.amount} ({self.status})>'
 
@@ -690,6 +1273,49 @@ CARD_ALIASES = {
 }
 
 
+# Bumped whenever this process writes a Card or CardAlias, so the lookup
+# snapshot below is rebuilt; the time bucket picks up other workers' writes
+_card_lookup_generation = 0
+CARD_LOOKUP_TTL_SECONDS = 30
+
+
+def _bump_card_lookup_generation(mapper, connection, target):
+    global _card_lookup_generation
+    _card_lookup_generation += 1
+
+
+def _bump_on_lookup_change(mapper, connection, target):
+    # Balance updates on Card don't affect name matching
+    state = db.inspect(target)
+    if any(state.attrs[key].history.has_changes() for key in ('name', 'apple_name', 'card_id') if key in state.attrs):
+        _bump_card_lookup_generation(mapper, connection, target)
+
+
+for _model in (Card, CardAlias):
+    event.listen(_model, 'after_insert', _bump_card_lookup_generation)
+    event.listen(_model, 'after_update', _bump_on_lookup_change)
+    event.listen(_model, 'after_delete', _bump_card_lookup_generation)
+
+
+@lru_cache(maxsize=1)
+def _card_lookup_snapshot(generation, time_bucket):
+    """
+    Card ids by lowercased alias / card name, plus (name, id) pairs for fuzzy matching.
+    Keeps the first row for duplicate names, like .first() did.
+    """
+    aliases = {}
+    for apple_name_lower, card_id in db.session.query(CardAlias.apple_name_lower, CardAlias.card_id):
+        aliases[apple_name_lower] = card_id
+
+    cards_by_name = {}
+    cards_list = []
+    for card_id, name in db.session.query(Card.id, Card.name).order_by(Card.id):
+        cards_by_name.setdefault(name.lower(), card_id)
+        cards_list.append((name.lower(), card_id))
+
+    return aliases, cards_by_name, cards_list
+
+
 def match_card_by_name(card_name_from_shortcut, create_alias_if_fuzzy=True):
     """
     Match card name from iOS Shortcuts to database card.
@@ -709,43 +1335,38 @@ def match_card_by_name(card_name_from_shortcut, create_alias_if_fuzzy=True):
     original_name = card_name_from_shortcut.strip()
     card_name = original_name.lower()
 
+    aliases, cards_by_name, cards_list = _card_lookup_snapshot(
+        _card_lookup_generation, int(time.time() // CARD_LOOKUP_TTL_SECONDS)
+    )
+
     # 1. Check CardAlias table first (user-defined mappings)
-    alias = CardAlias.query.filter(
-        db.func.lower(CardAlias.apple_name) == card_name
-    ).first()
-    if alias:
-        return alias.card, 'alias_db'
+    if card_name in aliases:
+        return db.session.get(Card, aliases[card_name]), 'alias_db'
 
     # 2. Check hardcoded aliases
     for alias_key, canonical in CARD_ALIASES.items():
-        if alias_key in card_name:
-            card = Card.query.filter(
-                db.func.lower(Card.name) == canonical
-            ).first()
+        if alias_key in card_name and canonical in cards_by_name:
+            card = db.session.get(Card, cards_by_name[canonical])
             if card:
                 return card, 'alias_hardcoded'
 
     # 3. Try exact match
-    card = Card.query.filter(
-        db.func.lower(Card.name) == card_name
-    ).first()
-    if card:
-        return card, 'exact'
+    if card_name in cards_by_name:
+        card = db.session.get(Card, cards_by_name[card_name])
+        if card:
+            return card, 'exact'
 
     # 4. Try fuzzy/substring match
-    cards = Card.query.all()
-    for card in cards:
-        if card_name in card.name.lower() or card.name.lower() in card_name:
-            # Auto-create alias for future matches
+    for name_lower, card_id in cards_list:
+        if card_name in name_lower or name_lower in card_name:
+            card = db.session.get(Card, card_id)
+            if not card:
+                continue
+            # Auto-create alias for future matches (committed with the caller's expense)
             if create_alias_if_fuzzy:
                 try:
-                    new_alias = CardAlias(
-                        apple_name=original_name,
-                        card_id=card.id
-                    )
-                    db.session.add(new_alias)
-                    db.session.commit()
-                    print(f"[ALIAS] Auto-created: '{original_name}' -> {card.name}")
+                    if CardAlias.insert_if_new(original_name, card.id):
+                        print(f"[ALIAS] Auto-created: '{original_name}' -> {card.name}")
                 except Exception as e:
                     print(f"[ALIAS] Could not auto-create alias: {e}")
                     db.session.rollback()
@@ -754,10 +1375,12 @@ def match_card_by_name(card_name_from_shortcut, create_alias_if_fuzzy=True):
     return None, None
 
 
+@lru_cache(maxsize=1024)
 def categorize_by_merchant(merchant_name):
     """
     Auto-categorize expense based on merchant name.
     Returns (category, source) tuple.
+    Cached: Apple Pay sends the same merchant strings over and over.
     """
     if not merchant_name:
         return ('Otros', 'default')
@@ -800,43 +1423,38 @@ def index():
 
 
 @app.route('/api/dashboard')
+@cache.cached(key_prefix=dashboard_cache_key)
+@read_only_db
 def dashboard_data():
     """Get all dashboard data"""
     
     # Get current balances
-    account = Account.query.first()
+    account = get_account()
     savings = SavingsAccount.query.first()
     
     # Get cards
     cards = Card.query.all()
-    cards_data = [c.to_dict() for c in cards]
+    cards_data = Card.dashboard_payload(cards)
+    
+    # Debt summary and cards grouped by statement type, in one pass over cards_data
+    total_closed = 0
+    total_open = 0
+    closed_cards = []
+    open_cards = []
+    for c in cards_data:
+        total_closed += c['closed_statement']['balance']
+        total_open += c['open_statement']['balance']
+        for statement, grouped in ((c['closed_statement'], closed_cards), (c['open_statement'], open_cards)):
+            if statement['balance'] > 0:
+                grouped.append({
+                    'name': c['name'],
+                    'balance': statement['balance'],
+                    'payment_date': statement['payment_date'],
+                    'days_until_payment': statement['days_until_payment']
+                })
     
-    # Calculate debt summary
-    total_closed = sum(c['closed_statement']['balance'] for c in cards_data)
-    total_open = sum(c['open_statement']['balance'] for c in cards_data)
     total_debt = total_closed + total_open
     
-    # Cards grouped by statement type
-    closed_cards = [
-        {
-            'name': c['name'],
-            'balance': c['closed_statement']['balance'],
-            'payment_date': c['closed_statement']['payment_date'],
-            'days_until_payment': c['closed_statement']['days_until_payment']
-        }
-        for c in cards_data if c['closed_statement']['balance'] > 0
-    ]
-    
-    open_cards = [
-        {
-            'name': c['name'],
-            'balance': c['open_statement']['balance'],
-            'payment_date': c['open_statement']['payment_date'],
-            'days_until_payment': c['open_statement']['days_until_payment']
-        }
-        for c in cards_data if c['open_statement']['balance'] > 0
-    ]
-    
     # Get next paychecks
     income = IncomeSchedule.query.first()
     
@@ -863,6 +1481,29 @@ def dashboard_data():
     })
 
 
+@cache.memoize(timeout=10)
+def liquidity_snapshot(today):
+    """Liquidity inputs of /api/recommend as plain data, so repeated recommendations skip the queries"""
+    # Get fixed expenses for liquidity check - ONLY UNPAID THIS MONTH
+    # Total and largest unpaid amount (largest is treated as rent) come straight from SQL
+    fixed_expenses_monthly, rent_amount = db.session.query(
+        func.coalesce(func.sum(FixedExpense.amount), 0.0),
+        func.coalesce(func.max(FixedExpense.amount), 0)
+    ).filter(FixedExpense.unpaid_in(today.month, today.year)).one()
+    
+    cards = Card.query.all()
+    return {
+        'fixed_expenses_monthly': fixed_expenses_monthly,
+        'rent_amount': rent_amount,
+        # Only cards with a closed balance can have a payment coming up
+        'closed_statements': [
+            (card.name, balance, payment_date)
+            for card, (balance, payment_date) in zip(cards, Card.closed_statements(cards))
+            if balance > 0
+        ]
+    }
+
+
 @app.route('/api/recommend', methods=['POST'])
 def recommend_card():
     """
@@ -904,59 +1545,39 @@ def recommend_card():
         if is_deferred and not num_payments:
             return jsonify({'error': 'num_payments required when is_deferred is true'}), 400
         
-        # Get all necessary data
+        # Get all necessary data: cards, plus the three single-row settings tables in
+        # one round-trip (if any of them is empty the system isn't configured anyway)
         cards = Card.query.all()
-        account = Account.query.first()
-        income = IncomeSchedule.query.first()
-        savings_goal = SavingsGoal.query.first()
+        settings = db.session.query(Account, IncomeSchedule, SavingsGoal).select_from(Account).join(
+            IncomeSchedule, true()
+        ).join(SavingsGoal, true()).first()
+        account, income, savings_goal = settings or (None, None, None)
         
         if not all([cards, account, income, savings_goal]):
             return jsonify({'error': 'Sistema no configurado. Configure tarjetas, cuenta e ingresos.'}), 400
         
-        # Get fixed expenses for liquidity check - ONLY UNPAID THIS MONTH
-        today = datetime.now()
-        fixed_expenses = FixedExpense.query.filter_by(active=True).all()
-        
-        # Calculate which expenses are NOT yet paid this month
-        unpaid_fixed_expenses = []
-        for expense in fixed_expenses:
-            # Check if already paid this month
-            payment = ExpensePayment.query.filter_by(
-                expense_id=expense.id,
-                month=today.month,
-                year=today.year
-            ).first()
-            
-            if not payment:
-                # Not paid yet - include in pending
-                unpaid_fixed_expenses.append(expense)
-        
-        fixed_expenses_monthly = sum(e.amount for e in unpaid_fixed_expenses)
-        rent_amount = max([e.amount for e in unpaid_fixed_expenses], default=0)  # Largest unpaid expense
+        # Unpaid fixed expenses and closed statements, shared by repeated calls (see liquidity_snapshot)
+        snapshot = liquidity_snapshot(request_today())
+        fixed_expenses_monthly = snapshot['fixed_expenses_monthly']
+        rent_amount = snapshot['rent_amount']
         
         # Calculate card payments due within 30 days FROM PURCHASE DATE
-        from datetime import datetime as dt
         purchase_date_for_calc = purchase_date.date() if isinstance(purchase_date, datetime) else purchase_date
+        purchase_ordinal = purchase_date_for_calc.toordinal()
         
         card_payments_this_month = []
-        for card in cards:
-            card_dict = card.to_dict()
-            
-            # Get closed statement payment info (corrected key name)
-            closed_statement = card_dict.get('closed_statement', {})
-            if closed_statement.get('balance', 0) > 0:
-                payment_date_str = closed_statement.get('payment_date')
-                if payment_date_str:
-                    card_payment_date = dt.fromisoformat(payment_date_str).date()
-                    
+        for card_name, closed_balance, card_payment_date in snapshot['closed_statements']:
+            # Only the closed statement matters here
+            if closed_balance > 0:
+                if card_payment_date:
                     # Check if payment is due within 30 days FROM PURCHASE DATE
-                    days_until_payment = (card_payment_date - purchase_date_for_calc).days
+                    days_until_payment = card_payment_date.toordinal() - purchase_ordinal
                     
                     if 0 <= days_until_payment <= 30:
                         card_payments_this_month.append({
-                            'card_name': card.name,
-                            'amount': closed_statement['balance'],
-                            'payment_date': payment_date_str,
+                            'card_name': card_name,
+                            'amount': closed_balance,
+                            'payment_date': card_payment_date.isoformat(),
                             'days_until': days_until_payment
                         })
         
@@ -1005,23 +1626,24 @@ def recommend_card():
             )
             
             db.session.add(recommendation)
-            db.session.commit()
-            db.session.refresh(recommendation)
+            db.session.flush()  # Assigns recommendation.id for the schedule rows
             
-            # Save deferred payment schedule if applicable
+            # Save deferred payment schedule if applicable (one multi-row INSERT)
             if is_deferred and result.get('deferred_schedule'):
-                for payment_info in result['deferred_schedule']['schedule']:
-                    schedule_entry = DeferredPaymentSchedule(
-                        recommendation_id=recommendation.id,
-                        payment_number=payment_info['payment_number'],
-                        payment_amount=payment_info['payment_amount'],
-                        expected_date=datetime.fromisoformat(payment_info['expected_date']).date(),
-                        card_statement_close_date=datetime.fromisoformat(payment_info['statement_close_date']).date(),
-                        status='pending'
-                    )
-                    db.session.add(schedule_entry)
-                
-                db.session.commit()
+                db.session.execute(insert(DeferredPaymentSchedule), [
+                    {
+                        'recommendation_id': recommendation.id,
+                        'payment_number': payment_info['payment_number'],
+                        'payment_amount': payment_info['payment_amount'],
+                        'expected_date': datetime.fromisoformat(payment_info['expected_date']).date(),
+                        'card_statement_close_date': datetime.fromisoformat(payment_info['statement_close_date']).date(),
+                        'status': 'pending'
+                    }
+                    for payment_info in result['deferred_schedule']['schedule']
+                ])
+            
+            # Recommendation and schedule are saved in a single transaction
+            db.session.commit()
             
             saved_recommendation = recommendation.to_dict()
         
@@ -1035,43 +1657,62 @@ def recommend_card():
         })
         
     except Exception as e:
-        print(f"Error in recommend: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error in recommend: %s', e)
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/recommendations', methods=['GET'])
+@read_only_db
 def get_recommendations():
     """Get all pending purchase recommendations"""
     try:
-        recommendations = PurchaseRecommendation.query.filter_by(status='pending').order_by(PurchaseRecommendation.created_at.desc()).all()
+        # Plain rows instead of ORM objects; card names come from the join
+        recommendations = db.session.execute(
+            select(
+                *PurchaseRecommendation.__table__.columns,
+                Card.name.label('card_name')
+            ).outerjoin(Card, PurchaseRecommendation.recommended_card_id == Card.id).where(
+                PurchaseRecommendation.status == 'pending'
+            ).order_by(PurchaseRecommendation.created_at.desc())
+        ).all()
+        
+        # Payment schedules of all deferred recommendations in one query
+        schedules = {}
+        deferred_ids = [rec.id for rec in recommendations if rec.is_deferred]
+        if deferred_ids:
+            schedule_rows = db.session.execute(
+                select(DeferredPaymentSchedule.__table__).where(
+                    DeferredPaymentSchedule.recommendation_id.in_(deferred_ids)
+                ).order_by(DeferredPaymentSchedule.payment_number)
+            )
+            for row in schedule_rows:
+                schedules.setdefault(row.recommendation_id, []).append(
+                    DeferredPaymentSchedule.to_dict_from_row(row)
+                )
         
         result = []
         for rec in recommendations:
-            rec_dict = rec.to_dict()
+            rec_dict = PurchaseRecommendation.to_dict_from_row(rec)
             
             # Include payment schedule if deferred
             if rec.is_deferred:
-                schedule = DeferredPaymentSchedule.query.filter_by(recommendation_id=rec.id).order_by(DeferredPaymentSchedule.payment_number).all()
-                rec_dict['payment_schedule'] = [s.to_dict() for s in schedule]
+                rec_dict['payment_schedule'] = schedules.get(rec.id, [])
             
             result.append(rec_dict)
         
         return jsonify({'recommendations': result})
         
     except Exception as e:
-        print(f"Error getting recommendations: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error getting recommendations: %s', e)
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/recommendations/<int:rec_id>/execute', methods=['POST'])
+@locks_balances
 def execute_recommendation(rec_id):
     """Execute a saved recommendation - creates actual expense and updates card balance"""
     try:
-        recommendation = PurchaseRecommendation.query.get(rec_id)
+        recommendation = db.session.get(PurchaseRecommendation, rec_id)
         
         if not recommendation:
             return jsonify({'error': 'Recomendación no encontrada'}), 404
@@ -1091,7 +1732,7 @@ def execute_recommendation(rec_id):
         db.session.add(expense)
         
         # Update card balance (full amount goes to card immediately)
-        card = Card.query.get(recommendation.recommended_card_id)
+        card = recommendation.card
         card.current_balance += recommendation.amount
         
         # Mark recommendation as executed
@@ -1109,9 +1750,7 @@ def execute_recommendation(rec_id):
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error executing recommendation: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error executing recommendation: %s', e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -1119,7 +1758,7 @@ def execute_recommendation(rec_id):
 def cancel_recommendation(rec_id):
     """Cancel a pending recommendation"""
     try:
-        recommendation = PurchaseRecommendation.query.get(rec_id)
+        recommendation = db.session.get(PurchaseRecommendation, rec_id)
         
         if not recommendation:
             return jsonify({'error': 'Recomendación no encontrada'}), 404
@@ -1142,6 +1781,7 @@ def cancel_recommendation(rec_id):
 
 
 @app.route('/api/recommendations/execute-batch', methods=['POST'])
+@locks_balances
 def execute_batch_recommendations():
     """Execute multiple recommendations at once"""
     try:
@@ -1154,8 +1794,16 @@ def execute_batch_recommendations():
         results = []
         errors = []
         
+        # Load all recommendations with their cards up front (one query for the whole batch)
+        recommendations = {
+            r.id: r for r in PurchaseRecommendation.query.filter(
+                PurchaseRecommendation.id.in_(recommendation_ids)
+            )
+        }
+        expenses = []
+        
         for rec_id in recommendation_ids:
-            recommendation = PurchaseRecommendation.query.get(rec_id)
+            recommendation = recommendations.get(rec_id)
             
             if not recommendation:
                 errors.append(f'Recomendación #{rec_id} no encontrada')
@@ -1175,11 +1823,10 @@ def execute_batch_recommendations():
                     card_id=recommendation.recommended_card_id
                 )
                 
-                db.session.add(expense)
-                
                 # Update card balance
-                card = Card.query.get(recommendation.recommended_card_id)
+                card = recommendation.card
                 card.current_balance += recommendation.amount
+                expenses.append(expense)
                 
                 # Mark as executed
                 recommendation.status = 'executed'
@@ -1195,6 +1842,8 @@ def execute_batch_recommendations():
                 errors.append(f'Error ejecutando recomendación #{rec_id}: {str(e)}')
                 continue
         
+        # Expenses are inserted together in the single commit below
+        db.session.add_all(expenses)
         db.session.commit()
         
         return jsonify({
@@ -1206,9 +1855,7 @@ def execute_batch_recommendations():
         
     except Exception as e:
         db.session.rollback()
-        print(f"Error in batch execute: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error in batch execute: %s', e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -1217,7 +1864,7 @@ def cards_api():
     """Get all cards or create new card"""
     if request.method == 'GET':
         cards = Card.query.all()
-        return jsonify([c.to_dict() for c in cards])
+        return jsonify(Card.dashboard_payload(cards))
     
     elif request.method == 'POST':
         data = request.json
@@ -1235,12 +1882,13 @@ def cards_api():
 
 
 @app.route('/api/savings/transfer', methods=['POST'])
+@locks_balances
 def transfer_to_savings():
     """Transfer money to savings"""
     data = request.json
     amount = float(data['amount'])
     
-    account = Account.query.first()
+    account = get_account()
     savings = SavingsAccount.query.first()
     
     if account.balance < amount:
@@ -1259,11 +1907,12 @@ def transfer_to_savings():
 
 
 @app.route('/api/savings/calculate-available', methods=['GET'])
+@read_only_db
 def calculate_available_for_savings():
     """Calculate how much can be transferred to savings"""
     from cash_flow_calculator import CashFlowCalculator
     
-    account = Account.query.first()
+    account = get_account()
     savings_goal = SavingsGoal.query.first()
     income = IncomeSchedule.query.first()
     
@@ -1284,7 +1933,7 @@ def update_balance():
     data = request.json
     new_balance = float(data['balance'])
     
-    account = Account.query.first()
+    account = get_account()
     old_balance = account.balance
     account.balance = new_balance
     account.last_updated = datetime.utcnow()
@@ -1300,6 +1949,7 @@ def update_balance():
 
 
 @app.route('/api/expenses/fixed/mark-paid', methods=['POST'])
+@locks_balances
 def mark_expense_paid():
     """Mark a fixed expense as paid for current month"""
     data = request.json
@@ -1319,16 +1969,18 @@ def mark_expense_paid():
     card_id = data.get('card_id')
     already_in_balance = data.get('already_in_balance', False)
     
-    expense = FixedExpense.query.get(expense_id)
+    expense = db.session.get(FixedExpense, expense_id)
     if not expense:
         return jsonify({'error': 'Expense not found'}), 404
     
-    # Check if already paid for that specific month/year
-    existing = ExpensePayment.query.filter_by(
+    # Check if already paid for that specific month/year. Databases created before
+    # ix_expensepayment_expense_year_month may lack the unique index (create_all
+    # skips existing tables), so it only backs up this check
+    existing = db.session.scalar(select(ExpensePayment.id).filter_by(
         expense_id=expense_id,
         month=payment_date.month,
         year=payment_date.year
-    ).first()
+    ).limit(1))
     
     if existing:
         return jsonify({'error': f'Already marked as paid for {payment_date.strftime("%B %Y")}'}), 400
@@ -1353,10 +2005,9 @@ def mark_expense_paid():
     # Handle payment based on method
     if payment_method == 'cash':
         # Deduct from checking account
-        account = Account.query.first()
+        account = get_account()
         old_checking = account.balance
         account.balance -= payment.amount
-        account.last_updated = datetime.utcnow()
         
         response_data['checking_updated'] = True
         response_data['old_checking'] = old_checking
@@ -1364,7 +2015,7 @@ def mark_expense_paid():
         
     elif payment_method == 'card' and card_id:
         # Add to card balance (only if not already in balance)
-        card = Card.query.get(int(card_id))
+        card = db.session.get(Card, int(card_id))
         if not card:
             return jsonify({'error': 'Card not found'}), 404
         
@@ -1384,7 +2035,11 @@ def mark_expense_paid():
             response_data['note'] = 'Marked as paid without balance changes (already included)'
     
     db.session.add(payment)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': f'Already marked as paid for {payment_date.strftime("%B %Y")}'}), 400
     
     return jsonify(response_data)
 
@@ -1417,9 +2072,7 @@ def add_fixed_expense():
         })
     except Exception as e:
         db.session.rollback()
-        print(f"Error adding fixed expense: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error adding fixed expense: %s', e)
         return jsonify({'error': f'Error al agregar gasto fijo: {str(e)}'}), 500
 
 
@@ -1427,7 +2080,7 @@ def add_fixed_expense():
 def edit_fixed_expense(expense_id):
     """Edit a fixed expense"""
     try:
-        expense = FixedExpense.query.get(expense_id)
+        expense = db.session.get(FixedExpense, expense_id)
         if not expense:
             return jsonify({'error': 'Gasto fijo no encontrado'}), 404
         
@@ -1454,13 +2107,12 @@ def edit_fixed_expense(expense_id):
         })
     except Exception as e:
         db.session.rollback()
-        print(f"Error editing fixed expense: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error editing fixed expense: %s', e)
         return jsonify({'error': f'Error al editar gasto fijo: {str(e)}'}), 500
 
 
 @app.route('/api/expenses/variable/add', methods=['POST'])
+@locks_balances
 def add_variable_expense():
     """Add a variable expense (comida, gasolina, etc)"""
     data = request.json
@@ -1476,16 +2128,15 @@ def add_variable_expense():
         card_id=int(card_id) if card_id and card_id != '' else None
     )
     
-    account = Account.query.first()
     card_balance_updated = None
     
     # If paid with card, update card balance
     if expense.card_id:
-        card = Card.query.get(expense.card_id)
+        card = db.session.get(Card, expense.card_id)
         if card:
             # Determine if this expense goes to closed or open statement
             # Based on card's closing day and current date
-            today = datetime.now().date()
+            today = request_today()
             expense_day = expense_date.day
             current_day = today.day
             
@@ -1507,38 +2158,41 @@ def add_variable_expense():
                 'closed_balance': card.closed_balance,
                 'open_balance': card.open_balance
             }
-        # Don't deduct from checking - it will be paid later with card
+        # Don't deduct from checking - it will be paid later with card.
+        # Only the timestamp changes, so skip loading the Account row.
+        # float(): SQLite's RETURNING hands back whole-number REAL values as ints
+        new_balance = float(db.session.execute(
+            update(Account).where(
+                Account.id == select(func.min(Account.id)).scalar_subquery()
+            ).values(last_updated=datetime.utcnow()).returning(Account.balance)
+        ).scalar())
     else:
         # If paid with cash/debit, deduct from checking
+        account = get_account()
         account.balance -= expense.amount
-    
-    account.last_updated = datetime.utcnow()
+        new_balance = account.balance
 
     db.session.add(expense)
     db.session.commit()
 
     # Index expense in RAG system (non-blocking)
-    try:
-        engine = get_insights_engine()
-        if engine:
-            engine.index_expense(expense)
-    except Exception as e:
-        print(f"RAG indexing error (non-critical): {e}")
+    index_expense_in_background(expense.id)
 
     return jsonify({
         'success': True,
         'expense': expense.to_dict(),
-        'new_balance': account.balance,
+        'new_balance': new_balance,
         'card_updated': card_balance_updated
     })
 
 
 @app.route('/api/expenses/variable/<int:expense_id>/edit', methods=['POST'])
+@locks_balances
 def edit_variable_expense(expense_id):
     """Edit a variable expense and update balances accordingly"""
     data = request.json
     
-    expense = VariableExpenseLog.query.get(expense_id)
+    expense = db.session.get(VariableExpenseLog, expense_id)
     if not expense:
         return jsonify({'error': 'Expense not found'}), 404
     
@@ -1557,13 +2211,13 @@ def edit_variable_expense(expense_id):
     
     new_expense_date = datetime.fromisoformat(data.get('expense_date', expense.expense_date.isoformat()))
     
-    account = Account.query.first()
+    account = get_account()
     
     # STEP 1: Reverse old transaction
     if old_card_id:
         # Was on card - remove from card balance
         # Need to determine which balance it was in originally
-        old_card = Card.query.get(old_card_id)
+        old_card = db.session.get(Card, old_card_id)
         if old_card:
             # Try to remove from open first (most common)
             if old_card.open_balance >= old_amount:
@@ -1579,7 +2233,7 @@ def edit_variable_expense(expense_id):
     card_balance_updated = None
     if new_card_id:
         # Put on card - ALWAYS goes to OPEN (current billing cycle)
-        new_card = Card.query.get(new_card_id)
+        new_card = db.session.get(Card, new_card_id)
         if new_card:
             new_card.open_balance += new_amount
             
@@ -1611,19 +2265,20 @@ def edit_variable_expense(expense_id):
 
 
 @app.route('/api/expenses/variable/<int:expense_id>/delete', methods=['POST', 'DELETE'])
+@locks_balances
 def delete_variable_expense(expense_id):
     """Delete a variable expense and reverse balance changes"""
-    expense = VariableExpenseLog.query.get(expense_id)
+    expense = db.session.get(VariableExpenseLog, expense_id)
     if not expense:
         return jsonify({'error': 'Expense not found'}), 404
     
-    account = Account.query.first()
+    account = get_account()
     card_balance_updated = None
     
     # Reverse the transaction
     if expense.card_id:
         # Was on card - remove from card balance
-        card = Card.query.get(expense.card_id)
+        card = db.session.get(Card, expense.card_id)
         if card:
             # Smart removal: try OPEN first (most common), then CLOSED
             statement_affected = 'OPEN'
@@ -1661,37 +2316,66 @@ def delete_variable_expense(expense_id):
 
 
 @app.route('/api/expenses/this-month', methods=['GET'])
+@read_only_db
 def get_expenses_this_month():
     """Get all expenses paid/logged this month"""
     today = datetime.now()
-    
+    start_of_month = datetime(today.year, today.month, 1)
+
+    # ?totals_only=1 returns just the sums, computed by the DB without loading any rows
+    if request.args.get('totals_only') == '1':
+        totals = db.session.execute(
+            select(
+                select(func.coalesce(func.sum(ExpensePayment.amount), 0)).where(
+                    ExpensePayment.month == today.month,
+                    ExpensePayment.year == today.year
+                ).scalar_subquery().label('total_fixed_paid'),
+                select(func.coalesce(func.sum(VariableExpenseLog.amount), 0)).where(
+                    VariableExpenseLog.expense_date >= start_of_month
+                ).scalar_subquery().label('total_variable'),
+                select(func.coalesce(func.sum(CardPayment.amount), 0)).where(
+                    CardPayment.payment_date >= start_of_month
+                ).scalar_subquery().label('total_card_payments')
+            )
+        ).one()
+        return jsonify(dict(totals._mapping))
+
     # Fixed expenses paid
-    fixed_paid = ExpensePayment.query.filter_by(
+    fixed_paid = ExpensePayment.query.options(joinedload(ExpensePayment.expense)).filter_by(
         month=today.month,
         year=today.year
     ).all()
     
-    # Variable expenses
-    start_of_month = datetime(today.year, today.month, 1)
-    variable_expenses = VariableExpenseLog.query.filter(
-        VariableExpenseLog.expense_date >= start_of_month
+    # Variable expenses (Core rows with the card name joined in, no per-row card lookup)
+    variable_expenses = db.session.execute(
+        select(
+            VariableExpenseLog.id, VariableExpenseLog.category, VariableExpenseLog.amount,
+            VariableExpenseLog.description, VariableExpenseLog.expense_date, VariableExpenseLog.card_id,
+            Card.name.label('card_name')
+        ).outerjoin(Card, VariableExpenseLog.card_id == Card.id).where(
+            VariableExpenseLog.expense_date >= start_of_month
+        )
     ).all()
     
-    # Fixed expenses NOT yet paid
-    all_fixed = FixedExpense.query.filter_by(active=True).all()
-    paid_ids = {p.expense_id for p in fixed_paid}
-    unpaid_fixed = [e for e in all_fixed if e.id not in paid_ids]
+    # Fixed expenses NOT yet paid (only those rows are fetched)
+    unpaid_fixed = FixedExpense.query.filter(FixedExpense.unpaid_in(today.month, today.year)).all()
     
     # Card payments this month
-    card_payments = CardPayment.query.filter(
-        CardPayment.payment_date >= start_of_month
+    card_payments = db.session.execute(
+        select(
+            CardPayment.id, CardPayment.card_id, CardPayment.amount,
+            CardPayment.payment_date, CardPayment.notes,
+            Card.name.label('card_name')
+        ).outerjoin(Card, CardPayment.card_id == Card.id).where(
+            CardPayment.payment_date >= start_of_month
+        )
     ).all()
     
     return jsonify({
         'fixed_paid': [p.to_dict() for p in fixed_paid],
         'fixed_unpaid': [e.to_dict() for e in unpaid_fixed],
-        'variable_expenses': [v.to_dict() for v in variable_expenses],
-        'card_payments': [cp.to_dict() for cp in card_payments],
+        'variable_expenses': [VariableExpenseLog.to_dict_from_row(v) for v in variable_expenses],
+        'card_payments': [CardPayment.to_dict_from_row(cp) for cp in card_payments],
         'total_fixed_paid': sum(p.amount for p in fixed_paid),
         'total_variable': sum(v.amount for v in variable_expenses),
         'total_card_payments': sum(cp.amount for cp in card_payments)
@@ -1711,14 +2395,37 @@ def pay_credit_card():
     else:
         payment_date = datetime.now()
     
-    card = Card.query.get(card_id)
-    if not card:
+    # Apply the payment in SQL so concurrent payments can't overwrite each other's balances:
+    # first reduce closed_balance, then open_balance with the excess (SET sees the old values)
+    closed_share = case((Card.closed_balance > 0, func.min(amount, Card.closed_balance)), else_=0)
+    card_balances = db.session.execute(
+        update(Card).where(Card.id == card_id).values(
+            closed_balance=case(
+                (Card.closed_balance > 0, func.max(Card.closed_balance - amount, 0)),
+                else_=Card.closed_balance
+            ),
+            open_balance=case(
+                (Card.open_balance > 0, func.max(Card.open_balance - (amount - closed_share), 0)),
+                else_=Card.open_balance
+            ),
+            # Also update current_balance for legacy compatibility
+            current_balance=func.max(Card.current_balance - amount, 0)
+        ).returning(Card.current_balance, Card.closed_balance, Card.open_balance)
+    ).first()
+    if not card_balances:
+        db.session.rollback()
         return jsonify({'error': 'Card not found'}), 404
     
-    account = Account.query.first()
-    
-    # Verify checking has enough balance
-    if account.balance < amount:
+    # Deduct from checking only if it covers the payment
+    new_checking_balance = db.session.execute(
+        update(Account).where(
+            Account.id == select(func.min(Account.id)).scalar_subquery(),
+            Account.balance >= amount
+        ).values(balance=Account.balance - amount).returning(Account.balance)
+    ).scalar()
+    if new_checking_balance is None:
+        db.session.rollback()
+        account = get_account()
         return jsonify({
             'error': f'Saldo insuficiente en checking (${account.balance:.2f})'
         }), 400
@@ -1728,53 +2435,44 @@ def pay_credit_card():
         card_id=card_id,
         amount=amount,
         payment_date=payment_date,
-        notes=data.get('notes', '')
+        notes=data.get('notes', ''),
+        idempotency_key=data.get('idempotency_key') or None
     )
     
-    # Update balances - first reduce closed_balance, then open_balance if excess
-    remaining_payment = amount
-
-    # First, apply payment to closed_balance
-    if card.closed_balance > 0:
-        if remaining_payment >= card.closed_balance:
-            remaining_payment -= card.closed_balance
-            card.closed_balance = 0
-        else:
-            card.closed_balance -= remaining_payment
-            remaining_payment = 0
-
-    # If there's remaining payment, apply to open_balance
-    if remaining_payment > 0 and card.open_balance > 0:
-        if remaining_payment >= card.open_balance:
-            remaining_payment -= card.open_balance
-            card.open_balance = 0
-        else:
-            card.open_balance -= remaining_payment
-            remaining_payment = 0
-
-    # Also update current_balance for legacy compatibility
-    card.current_balance -= amount
-    if card.current_balance < 0:
-        card.current_balance = 0
-
-    account.balance -= amount       # Deduct from checking
-    account.last_updated = datetime.utcnow()
-    
     db.session.add(payment)
-    db.session.commit()
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # Retry of a payment that was already applied: undo this attempt, report the original
+        db.session.rollback()
+        existing = CardPayment.query.filter_by(idempotency_key=payment.idempotency_key).first()
+        if not existing:
+            raise
+        card = existing.card
+        return jsonify({
+            'success': True,
+            'duplicate': True,
+            'payment': existing.to_dict(),
+            'new_card_balance': card.current_balance,
+            'new_closed_balance': card.closed_balance,
+            'new_open_balance': card.open_balance,
+            'new_checking_balance': get_account().balance
+        })
     
+    # float(): SQLite's RETURNING hands back whole-number REAL values as ints
     return jsonify({
         'success': True,
         'payment': payment.to_dict(),
-        'new_card_balance': card.current_balance,
-        'new_closed_balance': card.closed_balance,
-        'new_open_balance': card.open_balance,
-        'new_checking_balance': account.balance
+        'new_card_balance': float(card_balances.current_balance),
+        'new_closed_balance': float(card_balances.closed_balance),
+        'new_open_balance': float(card_balances.open_balance),
+        'new_checking_balance': float(new_checking_balance)
     })
 
 
 @app.route('/api/expenses/apple-pay', methods=['POST'])
 @require_apple_pay_api_key
+@locks_balances
 def add_apple_pay_expense():
     """
     Add expense from Apple Pay transaction via iOS Shortcuts.
@@ -1786,10 +2484,12 @@ def add_apple_pay_expense():
         "card_name": "Apple Card",
         "merchant": "Starbucks",
         "transaction_date": "2026-01-21T10:30:00",
-        "user": "Tak"  // optional - who made the purchase
+        "user": "Tak",  // optional - who made the purchase
+        "idempotency_key": "..."  // optional - retries with the same key are recorded once
     }
 
     Responses:
+    - 200: Duplicate of an already registered idempotency_key
     - 201: Expense registered successfully
     - 202: Expense saved as pending (card not found, needs review)
     - 400: Bad request
@@ -1810,8 +2510,9 @@ def add_apple_pay_expense():
         transaction_date_str = data.get('transaction_date')
         if transaction_date_str:
             try:
+                # Shortcuts sends UTC as a trailing 'Z' or '+00:00'; store it naive
                 transaction_date = datetime.fromisoformat(
-                    transaction_date_str.replace('Z', '+00:00').replace('+00:00', '')
+                    transaction_date_str.removesuffix('Z').removesuffix('+00:00')
                 )
             except ValueError:
                 transaction_date = datetime.now()
@@ -1839,7 +2540,7 @@ def add_apple_pay_expense():
             db.session.add(pending)
             db.session.commit()
 
-            available = [c.name for c in Card.query.all()]
+            available = list(db.session.scalars(select(Card.name).order_by(Card.id)))
             return jsonify({
                 'success': True,
                 'status': 'pending_review',
@@ -1873,46 +2574,68 @@ def add_apple_pay_expense():
             amount=amount,
             description=description,
             expense_date=transaction_date,
-            card_id=card.id if card else None
+            card_id=card.id if card else None,
+            idempotency_key=data.get('idempotency_key') or None
         )
 
-        account = Account.query.first()
         card_balance_updated = None
 
-        # Update balances
-        if card:
-            # Card payment - add to open balance
-            card.open_balance += amount
-            card_balance_updated = {
-                'card_name': card.name,
-                'closed_balance': card.closed_balance,
-                'open_balance': card.open_balance
-            }
-        else:
-            # Cash/debit - deduct from checking
-            if account:
-                account.balance -= amount
-
-        if account:
-            account.last_updated = datetime.utcnow()
-
         db.session.add(expense)
-        db.session.commit()
+        try:
+            # Update balances
+            if card:
+                # Card payment - add to open balance
+                card.open_balance += amount
+                card_balance_updated = {
+                    'card_name': card.name,
+                    'closed_balance': card.closed_balance,
+                    'open_balance': card.open_balance
+                }
+                # Checking only gets a new timestamp, so skip loading the Account row.
+                # float(): SQLite's RETURNING hands back whole-number REAL values as ints
+                new_balance = db.session.execute(
+                    update(Account).where(
+                        Account.id == select(func.min(Account.id)).scalar_subquery()
+                    ).values(last_updated=datetime.utcnow()).returning(Account.balance)
+                ).scalar()
+                if new_balance is not None:
+                    new_balance = float(new_balance)
+            else:
+                # Cash/debit - deduct from checking
+                account = get_account()
+                new_balance = None
+                if account:
+                    account.balance -= amount
+                    new_balance = account.balance
+
+            # Serialize before the commit expires the rows, which would cost a
+            # refresh SELECT each for the expense, its card and the account
+            db.session.flush()
+            expense_dict = expense.to_dict()
+            db.session.commit()
+        except IntegrityError:
+            # Retried transaction already registered: undo this attempt, report the original
+            db.session.rollback()
+            existing = VariableExpenseLog.query.filter_by(idempotency_key=expense.idempotency_key).first()
+            if not existing:
+                raise
+            account = get_account()
+            return jsonify({
+                'success': True,
+                'status': 'duplicate',
+                'expense': existing.to_dict(),
+                'new_balance': account.balance if account else None,
+                'user': user or None
+            }), 200
 
         # Index in RAG system (non-blocking)
-        try:
-            from rag.insights_engine import get_insights_engine
-            engine = get_insights_engine()
-            if engine:
-                engine.index_expense(expense)
-        except Exception as e:
-            print(f"RAG indexing error (non-critical): {e}")
+        index_expense_in_background(expense_dict['id'])
 
         return jsonify({
             'success': True,
             'status': 'registered',
-            'expense': expense.to_dict(),
-            'new_balance': account.balance if account else None,
+            'expense': expense_dict,
+            'new_balance': new_balance,
             'card_updated': card_balance_updated,
             'match_type': match_type,
             'auto_categorized': True,
@@ -1922,9 +2645,7 @@ def add_apple_pay_expense():
 
     except Exception as e:
         db.session.rollback()
-        print(f"Error adding Apple Pay expense: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error adding Apple Pay expense: %s', e)
         return jsonify({'error': str(e)}), 500
 
 
@@ -1933,20 +2654,27 @@ def add_apple_pay_expense():
 # ============================================================================
 
 @app.route('/api/apple-pay/pending', methods=['GET'])
+@read_only_db
 def get_pending_apple_pay():
     """Get all pending Apple Pay expenses that need review"""
-    pending = PendingApplePayExpense.query.filter_by(status='pending').order_by(
+    pending = PendingApplePayExpense.query.options(
+        joinedload(PendingApplePayExpense.resolved_card)
+    ).filter_by(status='pending').order_by(
         PendingApplePayExpense.created_at.desc()
     ).all()
 
     return jsonify({
         'count': len(pending),
         'pending': [p.to_dict() for p in pending],
-        'available_cards': [{'id': c.id, 'name': c.name} for c in Card.query.all()]
+        'available_cards': [
+            {'id': c.id, 'name': c.name}
+            for c in db.session.execute(select(Card.id, Card.name).order_by(Card.id))
+        ]
     })
 
 
 @app.route('/api/apple-pay/pending/<int:pending_id>/resolve', methods=['POST'])
+@locks_balances
 def resolve_pending_apple_pay(pending_id):
     """
     Resolve a pending Apple Pay expense by assigning it to a card.
@@ -1958,7 +2686,7 @@ def resolve_pending_apple_pay(pending_id):
     }
     """
     try:
-        pending = PendingApplePayExpense.query.get(pending_id)
+        pending = db.session.get(PendingApplePayExpense, pending_id)
         if not pending:
             return jsonify({'error': 'Pending expense not found'}), 404
 
@@ -1972,7 +2700,7 @@ def resolve_pending_apple_pay(pending_id):
         if not card_id:
             return jsonify({'error': 'card_id is required'}), 400
 
-        card = Card.query.get(card_id)
+        card = db.session.get(Card, card_id)
         if not card:
             return jsonify({'error': 'Card not found'}), 404
 
@@ -2007,28 +2735,21 @@ def resolve_pending_apple_pay(pending_id):
         pending.resolved_at = datetime.utcnow()
 
         db.session.add(expense)
-        db.session.commit()
+        db.session.flush()  # Assigns expense.id without ending the transaction
 
         # Link expense to pending record
         pending.resolved_expense_id = expense.id
-        db.session.commit()
 
         # Create alias for future transactions
         alias_created = None
         if create_alias:
-            existing_alias = CardAlias.query.filter(
-                db.func.lower(CardAlias.apple_name) == pending.apple_card_name.lower()
-            ).first()
-
-            if not existing_alias:
-                new_alias = CardAlias(
-                    apple_name=pending.apple_card_name,
-                    card_id=card.id
-                )
-                db.session.add(new_alias)
-                db.session.commit()
+            new_alias = CardAlias.insert_if_new(pending.apple_card_name, card.id)
+            if new_alias:
                 alias_created = new_alias.to_dict()
 
+        # One commit: the expense, balance change, pending link and alias land together
+        db.session.commit()
+
         return jsonify({
             'success': True,
             'expense': expense.to_dict(),
@@ -2043,16 +2764,14 @@ def resolve_pending_apple_pay(pending_id):
 
     except Exception as e:
         db.session.rollback()
-        print(f"Error resolving pending expense: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error resolving pending expense: %s', e)
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/apple-pay/pending/<int:pending_id>/ignore', methods=['POST'])
 def ignore_pending_apple_pay(pending_id):
     """Mark a pending Apple Pay expense as ignored (won't be processed)"""
-    pending = PendingApplePayExpense.query.get(pending_id)
+    pending = db.session.get(PendingApplePayExpense, pending_id)
     if not pending:
         return jsonify({'error': 'Pending expense not found'}), 404
 
@@ -2070,14 +2789,18 @@ def ignore_pending_apple_pay(pending_id):
 
 
 @app.route('/api/apple-pay/aliases', methods=['GET'])
+@read_only_db
 def get_card_aliases():
     """Get all card aliases"""
-    aliases = CardAlias.query.order_by(CardAlias.created_at.desc()).all()
+    aliases = CardAlias.query.options(joinedload(CardAlias.card)).order_by(CardAlias.created_at.desc()).all()
 
     return jsonify({
         'count': len(aliases),
         'aliases': [a.to_dict() for a in aliases],
-        'available_cards': [{'id': c.id, 'name': c.name} for c in Card.query.all()]
+        'available_cards': [
+            {'id': c.id, 'name': c.name}
+            for c in db.session.execute(select(Card.id, Card.name).order_by(Card.id))
+        ]
     })
 
 
@@ -2104,7 +2827,7 @@ def create_card_alias():
 
         # Check if alias already exists
         existing = CardAlias.query.filter(
-            db.func.lower(CardAlias.apple_name) == apple_name.lower()
+            CardAlias.apple_name_lower == apple_name.lower()
         ).first()
         if existing:
             return jsonify({
@@ -2112,7 +2835,7 @@ def create_card_alias():
                 'existing_alias': existing.to_dict()
             }), 400
 
-        card = Card.query.get(card_id)
+        card = db.session.get(Card, card_id)
         if not card:
             return jsonify({'error': 'Card not found'}), 404
 
@@ -2137,7 +2860,7 @@ def create_card_alias():
 @app.route('/api/apple-pay/aliases/<int:alias_id>', methods=['DELETE'])
 def delete_card_alias(alias_id):
     """Delete a card alias"""
-    alias = CardAlias.query.get(alias_id)
+    alias = db.session.get(CardAlias, alias_id)
     if not alias:
         return jsonify({'error': 'Alias not found'}), 404
 
@@ -2198,9 +2921,7 @@ def add_card():
         })
     except Exception as e:
         db.session.rollback()
-        print(f"Error adding card: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error adding card: %s', e)
         return jsonify({'error': f'Error al guardar tarjeta: {str(e)}'}), 500
 
 
@@ -2208,7 +2929,7 @@ def add_card():
 def edit_card(card_id):
     """Edit an existing credit card"""
     try:
-        card = Card.query.get(card_id)
+        card = db.session.get(Card, card_id)
         if not card:
             return jsonify({'error': 'Tarjeta no encontrada'}), 404
         
@@ -2264,24 +2985,26 @@ def edit_card(card_id):
         })
     except Exception as e:
         db.session.rollback()
-        print(f"Error editing card: {e}")
-        import traceback
-        traceback.print_exc()
+        app.logger.exception('Error editing card: %s', e)
         return jsonify({'error': f'Error al editar tarjeta: {str(e)}'}), 500
 
 
 @app.route('/api/cards/<int:card_id>/delete', methods=['DELETE'])
 def delete_card(card_id):
     """Delete a credit card (only if no expenses or payments associated)"""
-    card = Card.query.get(card_id)
+    card = db.session.get(Card, card_id)
     if not card:
         return jsonify({'error': 'Tarjeta no encontrada'}), 404
     
-    # Check if card has associated expenses
-    var_expenses_count = VariableExpenseLog.query.filter_by(card_id=card_id).count()
-    payments_count = CardPayment.query.filter_by(card_id=card_id).count()
-    
-    if var_expenses_count > 0 or payments_count > 0:
+    # Check if card has associated expenses (EXISTS stops at the first row; counts only for the error)
+    has_history = db.session.scalar(select(
+        select(VariableExpenseLog.id).where(VariableExpenseLog.card_id == card_id).exists() |
+        select(CardPayment.id).where(CardPayment.card_id == card_id).exists()
+    ))
+
+    if has_history:
+        var_expenses_count = VariableExpenseLog.query.filter_by(card_id=card_id).count()
+        payments_count = CardPayment.query.filter_by(card_id=card_id).count()
         return jsonify({
             'error': f'No se puede eliminar. La tarjeta tiene {var_expenses_count} gastos y {payments_count} pagos registrados.',
             'suggestion': 'Puedes editar la tarjeta en su lugar.'
@@ -2298,6 +3021,7 @@ def delete_card(card_id):
 
 # Expense Category Management
 @app.route('/api/categories', methods=['GET'])
+@read_only_db
 def get_categories():
     """Get all expense categories"""
     categories = ExpenseCategory.query.order_by(ExpenseCategory.name).all()
@@ -2334,7 +3058,7 @@ def add_category():
 @app.route('/api/categories/<int:category_id>/delete', methods=['POST'])
 def delete_category(category_id):
     """Delete an expense category"""
-    category = ExpenseCategory.query.get(category_id)
+    category = db.session.get(ExpenseCategory, category_id)
     if not category:
         return jsonify({'error': 'Category not found'}), 404
 
@@ -2371,6 +3095,47 @@ def get_insights_engine():
     return _insights_engine
 
 
+# One background thread indexes new expenses, keeping embedding time out of the
+# request and vector store writes in order. Ids queue up while it works, so a burst
+# of expenses is indexed together with one query and one index_expenses_batch call.
+_rag_index_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='rag-index')
+_rag_index_queue = queue.SimpleQueue()
+RAG_INDEX_BATCH_SIZE = 32
+
+
+def _index_queued_expenses():
+    """Index every queued expense from the background thread, with its own app context and session"""
+    with app.app_context():
+        while True:
+            expense_ids = []
+            while len(expense_ids) < RAG_INDEX_BATCH_SIZE:
+                try:
+                    expense_ids.append(_rag_index_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if not expense_ids:
+                return
+            try:
+                engine = get_insights_engine()
+                if not engine:
+                    continue
+                expenses = VariableExpenseLog.query.options(
+                    joinedload(VariableExpenseLog.card)
+                ).filter(VariableExpenseLog.id.in_(expense_ids)).all()
+                # Release the (single) writer connection before the slow embedding step
+                db.session.close()
+                if expenses:
+                    engine.index_expenses_batch(expenses)
+            except Exception as e:
+                print(f"RAG indexing error (non-critical): {e}")
+
+
+def index_expense_in_background(expense_id):
+    """Queue an expense for RAG indexing and return immediately"""
+    _rag_index_queue.put(expense_id)
+    _rag_index_pool.submit(_index_queued_expenses)
+
+
 @app.route('/api/rag/status', methods=['GET'])
 def rag_status():
     """Get RAG system status"""
@@ -2477,7 +3242,106 @@ def get_anomalies():
     return jsonify(result)
 
 
+@cache.memoize(timeout=60)
+def build_chat_context(today):
+    """Spanish snapshot of balances, cards and this month's spending for the chat prompt"""
+    # Calculate this month's data
+    month_start = today.replace(day=1)
+
+    # The settings singletons and this month's card payment total in one statement
+    # (outer joins keep the row when there is no SavingsGoal yet). Only the columns the
+    # text uses are selected, so no ORM objects are built for these rows.
+    total_card_payments_sq = select(func.coalesce(func.sum(CardPayment.amount), 0)).where(
+        CardPayment.payment_date >= month_start
+    ).scalar_subquery()
+    snapshot = db.session.execute(
+        select(
+            Account.balance.label('checking_balance'),
+            SavingsAccount.balance.label('savings_balance'),
+            SavingsAccount.target.label('savings_target'),
+            SavingsGoal.amount_per_paycheck,
+            SavingsGoal.min_balance_comfort,
+            IncomeSchedule.amount.label('income_amount'),
+            IncomeSchedule.first_paycheck_day,
+            IncomeSchedule.second_paycheck_day,
+            total_card_payments_sq.label('total_card_payments')
+        ).select_from(Account).outerjoin(SavingsAccount, true()).outerjoin(
+            SavingsGoal, true()
+        ).outerjoin(IncomeSchedule, true()).limit(1)
+    ).first()
+    # Cards stay ORM objects: their statement dates come from model methods
+    cards = Card.query.all()
+
+    # Active fixed expenses with their paid/unpaid status for this month (NOT EXISTS per row)
+    fixed_expenses = db.session.execute(
+        select(
+            FixedExpense.name, FixedExpense.amount, FixedExpense.due_day,
+            FixedExpense.unpaid_in(today.month, today.year).label('unpaid')
+        ).where(FixedExpense.active == True)
+    ).all()
+
+    # Variable expenses this month, summed and ranked per category in SQL
+    category = func.coalesce(func.nullif(VariableExpenseLog.category, ''), 'Otros')
+    category_total = func.sum(VariableExpenseLog.amount)
+    var_by_category = db.session.query(category, category_total).filter(
+        VariableExpenseLog.expense_date >= month_start
+    ).group_by(category).order_by(category_total.desc(), category).all()
+    total_var = sum(amount for _, amount in var_by_category)
+
+    # Calculate savings status
+    savings_this_month = 0  # TODO: track actual transfers
+    has_goal = snapshot.amount_per_paycheck is not None
+    savings_goal_amt = snapshot.amount_per_paycheck if has_goal else 500
+    min_balance = snapshot.min_balance_comfort if has_goal else 2000
+
+    # Build current context line by line and join once at the end
+    lines = [
+        f"ESTADO FINANCIERO ACTUAL (Hoy: {today.strftime('%d/%m/%Y')}):",
+        "",
+        "CUENTAS:",
+        f"- Cuenta de cheques: ${snapshot.checking_balance:,.2f}",
+        f"- Fondo de emergencia: ${snapshot.savings_balance:,.2f} / ${snapshot.savings_target:,.2f}",
+        f"- Balance mínimo de confort: ${min_balance:,.2f}",
+        "",
+        "INGRESOS:",
+        f"- Catorcena: ${snapshot.income_amount:,.2f} "
+        f"(días {snapshot.first_paycheck_day} y {snapshot.second_paycheck_day})",
+        "",
+        "TARJETAS DE CRÉDITO:"
+    ]
+    lines.extend(
+        f"- {c.name}: Límite ${c.credit_limit:,.0f}, "
+        f"Balance cerrado ${closed_balance:,.2f} (vence {payment_date}), "
+        f"Balance abierto ${open_balance:,.2f} (cierra {close_date})"
+        for c, (closed_balance, payment_date, open_balance, close_date)
+        in zip(cards, Card.statement_summaries(cards))
+    )
+
+    lines += ["", "GASTOS FIJOS ESTE MES:"]
+    lines.extend(
+        f"- {f.name}: ${f.amount:.2f} día {f.due_day} [{'PENDIENTE' if f.unpaid else 'PAGADO'}]"
+        for f in fixed_expenses
+    )
+    lines.append(f"Total fijos: ${sum(f.amount for f in fixed_expenses):,.2f}")
+
+    lines += ["", f"GASTOS VARIABLES ESTE MES: ${total_var:,.2f}"]
+    if var_by_category:
+        lines.extend(f"- {cat}: ${amt:.2f}" for cat, amt in var_by_category)
+    else:
+        lines.append("- Sin gastos registrados")
+
+    lines += [
+        "",
+        f"PAGOS DE TARJETAS ESTE MES: ${snapshot.total_card_payments:,.2f}",
+        "",
+        f"META DE AHORRO: ${savings_goal_amt:,.2f} por catorcena"
+    ]
+
+    return "\n".join(lines)
+
+
 @app.route('/api/insights/chat', methods=['POST'])
+@read_only_db
 def chat_with_finances():
     """
     Chat conversationally about finances with full context
@@ -2498,140 +3362,121 @@ def chat_with_finances():
     if not message:
         return jsonify({'error': 'Message is required'}), 400
 
-    # Get current financial context from database
-    account = Account.query.first()
-    savings_account = SavingsAccount.query.first()
-    savings_goal = SavingsGoal.query.first()
-    income = IncomeSchedule.query.first()
-    cards = Card.query.all()
-    fixed_expenses = FixedExpense.query.filter_by(active=True).all()
-
-    # Calculate this month's data
-    today = datetime.now()
-    month_start = datetime(today.year, today.month, 1).date()
-
-    # Variable expenses this month
-    var_expenses = VariableExpenseLog.query.filter(
-        VariableExpenseLog.expense_date >= month_start
-    ).all()
-    total_var = sum(e.amount for e in var_expenses)
-
-    # Category breakdown
-    cat_totals = {}
-    for e in var_expenses:
-        cat = e.category or 'Otros'
-        cat_totals[cat] = cat_totals.get(cat, 0) + e.amount
+    # Composed from 4 queries; cached until the next write (see invalidate_response_cache)
+    current_context = build_chat_context(request_today())
+    # Return the connection to the pool before the slow LLM call
+    db.session.close()
 
-    # Card payments this month
-    card_payments_month = CardPayment.query.filter(
-        CardPayment.payment_date >= month_start
-    ).all()
-    total_card_payments = sum(p.amount for p in card_payments_month)
-
-    # Fixed expenses paid this month
-    paid_fixed = ExpensePayment.query.filter(
-        ExpensePayment.payment_month == today.month,
-        ExpensePayment.payment_year == today.year
-    ).all()
-    paid_fixed_ids = [p.expense_id for p in paid_fixed]
-
-    # Build current context
-    cards_info = []
-    for c in cards:
-        card_data = c.to_dict()
-        cards_info.append(
-            f"- {c.name}: Límite ${c.credit_limit:,.0f}, "
-            f"Balance cerrado ${card_data['closed_statement']['balance']:,.2f} "
-            f"(vence {card_data['closed_statement']['payment_date']}), "
-            f"Balance abierto ${card_data['open_statement']['balance']:,.2f} "
-            f"(cierra {card_data['open_statement']['close_date']})"
-        )
-
-    fixed_info = []
-    for f in fixed_expenses:
-        status = "PAGADO" if f.id in paid_fixed_ids else "PENDIENTE"
-        fixed_info.append(f"- {f.name}: ${f.amount:.2f} día {f.due_day} [{status}]")
-
-    cat_info = [f"- {cat}: ${amt:.2f}" for cat, amt in sorted(cat_totals.items(), key=lambda x: x[1], reverse=True)]
-
-    # Calculate savings status
-    savings_this_month = 0  # TODO: track actual transfers
-    savings_goal_amt = savings_goal.amount_per_paycheck if savings_goal else 500
-    min_balance = savings_goal.min_balance_comfort if savings_goal else 2000
-
-    current_context = f"""ESTADO FINANCIERO ACTUAL (Hoy: {today.strftime('%d/%m/%Y')}):
+    result = engine.chat(
+        message=message,
+        conversation_history=history,
+        current_context=current_context
+    )
+    return jsonify(result)
 
-CUENTAS:
-- Cuenta de cheques: ${account.balance:,.2f}
-- Fondo de emergencia: ${savings_account.balance:,.2f} / ${savings_account.target:,.2f}
-- Balance mínimo de confort: ${min_balance:,.2f}
 
-INGRESOS:
-- Catorcena: ${income.amount:,.2f} (días {income.first_paycheck_day} y {income.second_paycheck_day})
+RAG_REINDEX_JOB_TIMEOUT = 24 * 60 * 60
 
-TARJETAS DE CRÉDITO:
-{chr(10).join(cards_info)}
 
-GASTOS FIJOS ESTE MES:
-{chr(10).join(fixed_info)}
-Total fijos: ${sum(f.amount for f in fixed_expenses):,.2f}
+def _reindex_job_key(job_id):
+    # Kept in the shared (file system) cache so any Gunicorn worker can report the status
+    return f'rag_reindex/{job_id}'
 
-GASTOS VARIABLES ESTE MES: ${total_var:,.2f}
-{chr(10).join(cat_info) if cat_info else '- Sin gastos registrados'}
 
-PAGOS DE TARJETAS ESTE MES: ${total_card_payments:,.2f}
+def _reindex_rag_job(job_id):
+    """Rebuild the RAG index from the background thread, one batch of expenses at a time"""
+    with app.app_context():
+        cache.set(_reindex_job_key(job_id), {'status': 'running'}, timeout=RAG_REINDEX_JOB_TIMEOUT)
+        try:
+            engine = get_insights_engine()
 
-META DE AHORRO: ${savings_goal_amt:,.2f} por catorcena"""
+            # Index expenses in id order, loading one batch at a time so memory stays flat
+            expense_result = {'indexed': 0, 'errors': 0}
+            last_id = 0
+            while True:
+                expenses = VariableExpenseLog.query.options(
+                    joinedload(VariableExpenseLog.card)
+                ).filter(VariableExpenseLog.id > last_id).order_by(
+                    VariableExpenseLog.id
+                ).limit(engine.INDEX_BATCH_SIZE).all()
+                # Release the (single) writer connection before the slow embedding step
+                db.session.close()
+                if not expenses:
+                    break
+                batch_result = engine.index_expenses_batch(expenses)
+                expense_result['indexed'] += batch_result['indexed']
+                expense_result['errors'] += batch_result['errors']
+                last_id = expenses[-1].id
+
+            # The monthly summary only needs totals, so aggregate in SQL instead of loading every row
+            category_totals = db.session.query(
+                VariableExpenseLog.category, func.sum(VariableExpenseLog.amount)
+            ).group_by(VariableExpenseLog.category).all()
+            total_card_payments = db.session.query(
+                func.coalesce(func.sum(CardPayment.amount), 0.0)
+            ).scalar()
+            total_fixed = FixedExpense.active_total()
+            income = IncomeSchedule.query.first()
+            account = get_account()
+            savings = SavingsAccount.query.first()
+            db.session.close()
+
+            # Update monthly summary
+            month = datetime.now().strftime('%Y-%m')
+            engine.update_monthly_summary(
+                month=month,
+                variable_expenses=[{'category': category, 'amount': amount} for category, amount in category_totals],
+                fixed_expenses=[{'amount': total_fixed}],
+                card_payments=[{'amount': total_card_payments}],
+                income_amount=income.amount * 2 if income else 0,
+                checking_balance=account.balance if account else 0,
+                savings_balance=savings.balance if savings else 0
+            )
 
-    result = engine.chat(
-        message=message,
-        conversation_history=history,
-        current_context=current_context
-    )
-    return jsonify(result)
+            cache.set(_reindex_job_key(job_id), {
+                'status': 'finished',
+                'results': {
+                    'expenses': expense_result,
+                    'summaries': {'success': True},
+                    'patterns': {'count': 0}
+                }
+            }, timeout=RAG_REINDEX_JOB_TIMEOUT)
+        except Exception as e:
+            app.logger.exception('RAG reindex failed: %s', e)
+            cache.set(_reindex_job_key(job_id), {'status': 'failed', 'error': str(e)},
+                      timeout=RAG_REINDEX_JOB_TIMEOUT)
 
 
 @app.route('/api/rag/reindex', methods=['POST'])
 def reindex_rag():
-    """Reindex all data in ChromaDB (admin operation)"""
+    """Start reindexing all data in the vector store (admin operation); poll the status URL for the result"""
     engine = get_insights_engine()
     if not engine:
         return jsonify({'error': 'RAG system not available'}), 503
 
-    # Get all data from SQLAlchemy (within Flask context)
-    expenses = VariableExpenseLog.query.all()
-    fixed_expenses = FixedExpense.query.filter_by(active=True).all()
-    card_payments = CardPayment.query.all()
-    income = IncomeSchedule.query.first()
-    account = Account.query.first()
-    savings = SavingsAccount.query.first()
-
-    # Index expenses
-    expense_result = engine.index_expenses_batch(expenses)
-
-    # Update monthly summary
-    month = datetime.now().strftime('%Y-%m')
-    engine.update_monthly_summary(
-        month=month,
-        variable_expenses=expenses,
-        fixed_expenses=fixed_expenses,
-        card_payments=card_payments,
-        income_amount=income.amount * 2 if income else 0,
-        checking_balance=account.balance if account else 0,
-        savings_balance=savings.balance if savings else 0
-    )
+    job_id = uuid.uuid4().hex
+    cache.set(_reindex_job_key(job_id), {'status': 'queued'}, timeout=RAG_REINDEX_JOB_TIMEOUT)
+    # Same single thread as incremental indexing, so vector store writes stay in order
+    _rag_index_pool.submit(_reindex_rag_job, job_id)
 
     return jsonify({
         'success': True,
-        'results': {
-            'expenses': expense_result,
-            'summaries': {'success': True},
-            'patterns': {'count': 0}
-        }
-    })
+        'job_id': job_id,
+        'status_url': url_for('reindex_rag_status', job_id=job_id)
+    }), 202
+
+
+@app.route('/api/rag/reindex/status/<job_id>', methods=['GET'])
+def reindex_rag_status(job_id):
+    """Status of a reindex job started with POST /api/rag/reindex"""
+    job = cache.get(_reindex_job_key(job_id))
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job_id, **job})
 
 
 @app.route('/api/rag/index-expense', methods=['POST'])
+@read_only_db
 def index_single_expense():
     """Index a single expense (called automatically when adding expenses)"""
     engine = get_insights_engine()
@@ -2644,18 +3489,33 @@ def index_single_expense():
     if not expense_id:
         return jsonify({'error': 'expense_id is required'}), 400
 
-    expense = VariableExpenseLog.query.get(expense_id)
+    expense = db.session.get(VariableExpenseLog, expense_id, options=[joinedload(VariableExpenseLog.card)])
     if not expense:
         return jsonify({'error': 'Expense not found'}), 404
+    # Return the connection to the pool before the slow embedding step
+    db.session.close()
 
     success = engine.index_expense(expense)
     return jsonify({'success': success})
 
 
+@app.cli.command('refresh-cycle-dates')
+def refresh_cycle_dates_command():
+    """Store today's billing cycle dates on every card (cron: 5 0 * * *)"""
+    count = Card.refresh_cycle_dates()
+    print(f"✅ Cycle dates refreshed for {count} cards")
+
+
 # Initialize WAL mode when the module is loaded (for Gunicorn workers)
 with app.app_context():
     db.create_all()
     enable_wal_mode()
+    CardPaymentTotal.sync()
+    try:
+        Card.refresh_cycle_dates()
+    except Exception as e:
+        db.session.rollback()
+        print(f"⚠️ Could not refresh card cycle dates (run migrate_cycle_dates.py): {e}")
 
 
 if __name__ == '__main__':
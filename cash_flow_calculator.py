@@ -3,7 +3,7 @@ Cash Flow Calculator
 Analyzes cash flow and determines available savings
 """
 
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 from typing import Dict, List
 import calendar
 
@@ -40,22 +40,10 @@ class CashFlowCalculator:
         # Determine current paycheck period
         if today.day <= self.income_schedule.first_paycheck_day:
             current_period = 'first'
-            next_paycheck = datetime(today.year, today.month, self.income_schedule.first_paycheck_day)
-            if next_paycheck < today:
-                # Next paycheck is next month
-                if today.month == 12:
-                    next_paycheck = datetime(today.year + 1, 1, self.income_schedule.first_paycheck_day)
-                else:
-                    next_paycheck = datetime(today.year, today.month + 1, self.income_schedule.first_paycheck_day)
+            next_paycheck = self._next_occurrence(self.income_schedule.first_paycheck_day, today)
         else:
             current_period = 'second'
-            next_paycheck = datetime(today.year, today.month, self.income_schedule.second_paycheck_day)
-            if next_paycheck < today:
-                # Next paycheck is next month
-                if today.month == 12:
-                    next_paycheck = datetime(today.year + 1, 1, self.income_schedule.second_paycheck_day)
-                else:
-                    next_paycheck = datetime(today.year, today.month + 1, self.income_schedule.second_paycheck_day)
+            next_paycheck = self._next_occurrence(self.income_schedule.second_paycheck_day, today)
         
         # Calculate expenses until next paycheck
         upcoming_expenses = self._calculate_upcoming_expenses(today, next_paycheck)
@@ -81,20 +69,27 @@ class CashFlowCalculator:
             'current_period': current_period
         }
     
+    def _next_occurrence(self, day: int, now: datetime) -> datetime:
+        """Midnight of the given day of the month, this month or next month if it already passed."""
+        occurrence = datetime(now.year, now.month, day)
+        if occurrence < now:
+            # Next occurrence is next month
+            year, month = (now.year + 1, 1) if now.month == 12 else (now.year, now.month + 1)
+            occurrence = datetime(year, month, day)
+        return occurrence
+    
     def _calculate_upcoming_expenses(self, start: datetime, end: datetime) -> float:
         """Calculate total expenses between two dates."""
-        from app import Transaction, FixedExpense
+        from app import db, Transaction, FixedExpense
+        from sqlalchemy import func
         
-        total = 0.0
-        
-        # Card payments scheduled in this period
-        payments = Transaction.query.filter(
+        # Card payments scheduled in this period (summed in SQL)
+        total = db.session.query(
+            func.coalesce(func.sum(Transaction.amount), 0.0)
+        ).filter(
             Transaction.payment_date >= start,
             Transaction.payment_date <= end
-        ).all()
-        
-        for payment in payments:
-            total += payment.amount
+        ).scalar()
         
         # Fixed expenses due in this period
         fixed_expenses = FixedExpense.query.filter_by(active=True).all()
@@ -113,11 +108,15 @@ class CashFlowCalculator:
     
     def _is_due_in_period(self, due_day: int, start: datetime, end: datetime) -> bool:
         """Check if a monthly expense due day falls within a period."""
-        current = start
-        while current <= end:
-            if current.day == due_day:
-                return True
-            current += timedelta(days=1)
+        # Check the due date of each month the period spans (usually one or two)
+        year, month = start.year, start.month
+        while (year, month) <= (end.year, end.month):
+            # Months without that day (e.g. the 31st in April) have no due date
+            if due_day <= calendar.monthrange(year, month)[1]:
+                # Keep start's time of day so the comparison matches a day-by-day walk
+                if start <= start.replace(year=year, month=month, day=due_day) <= end:
+                    return True
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
         return False
     
     def project_savings_timeline(self, months: int = 12) -> List[Dict]:
@@ -132,45 +131,42 @@ class CashFlowCalculator:
         - Savings added
         - Ending balance
         """
-        from app import SavingsAccount, BonusEvent
+        from app import db, SavingsAccount, BonusEvent, FixedExpense, Card
+        from sqlalchemy import func
         
         savings = SavingsAccount.query.first()
         current_savings = savings.balance if savings else 0
         current_checking = self.current_balance
         
+        # Income and expenses don't change from month to month, so query them once
+        monthly_income = self.income_schedule.amount * 2
+        fixed_total = FixedExpense.active_total()
+        variable_total = self.savings_goal.variable_expenses_monthly
+        
+        # Credit card payments (estimate from current balances)
+        # This is simplified - in production would project actual transactions
+        card_payments = db.session.query(
+            func.coalesce(func.sum(Card.current_balance), 0.0)
+        ).scalar()
+        
+        monthly_expenses = fixed_total + variable_total + card_payments
+        
+        # Pending bonuses by (year, month); a later event in the same month replaces an earlier one
+        bonus_by_month = {
+            (event.expected_date.year, event.expected_date.month): event.amount
+            for event in BonusEvent.query.filter(BonusEvent.received == False).all()
+        }
+        
         projections = []
-        current_date = datetime.now()
+        # Only the month and year of each step are used
+        current_date = date.today()
         
         for month_offset in range(months):
             # Calculate month
             month_date = current_date + timedelta(days=30 * month_offset)
             
-            # Income for month (2 paychecks)
-            monthly_income = self.income_schedule.amount * 2
-            
-            # Expenses for month
-            from app import FixedExpense
-            fixed_expenses = FixedExpense.query.filter_by(active=True).all()
-            fixed_total = sum(e.amount for e in fixed_expenses)
-            variable_total = self.savings_goal.variable_expenses_monthly
-            
-            # Credit card payments (estimate from current balances)
-            # This is simplified - in production would project actual transactions
-            from app import Card
-            cards = Card.query.filter_by(active=True).all()
-            card_payments = sum(c.current_balance for c in cards)
-            
-            monthly_expenses = fixed_total + variable_total + card_payments
-            
             # Check for bonus
-            bonus = 0
-            bonus_events = BonusEvent.query.filter(
-                BonusEvent.received == False
-            ).all()
-            for event in bonus_events:
-                if event.expected_date.year == month_date.year and \
-                   event.expected_date.month == month_date.month:
-                    bonus = event.amount
+            bonus = bonus_by_month.get((month_date.year, month_date.month), 0)
             
             # Savings for month
             net_monthly = monthly_income + bonus - monthly_expenses
@@ -208,11 +204,12 @@ class CashFlowCalculator:
         - Card payments
         - Available for savings
         """
-        from app import FixedExpense, Transaction
+        from app import db, FixedExpense, Transaction
+        from sqlalchemy import func
         
-        today = datetime.now()
+        today = date.today()
         
-        # Determine period dates
+        # Determine period dates (datetimes: they bound the Transaction.payment_date DateTime column)
         if period == 'first':
             start = datetime(today.year, today.month, 1)
             end = datetime(today.year, today.month, self.income_schedule.first_paycheck_day)
@@ -236,11 +233,12 @@ class CashFlowCalculator:
         variable_in_period = self.savings_goal.variable_expenses_monthly / 2
         
         # Card payments in period
-        card_payments = Transaction.query.filter(
+        card_total = db.session.query(
+            func.coalesce(func.sum(Transaction.amount), 0.0)
+        ).filter(
             Transaction.payment_date >= start,
             Transaction.payment_date <= end
-        ).all()
-        card_total = sum(p.amount for p in card_payments)
+        ).scalar()
         
         # Calculate available
         total_expenses = fixed_in_period + variable_in_period + card_total
@@ -3,17 +3,39 @@ Gunicorn configuration for Cash Flow Optimizer
 Production deployment
 """
 import multiprocessing
+import os
+from dotenv import load_dotenv
+
+# Parse .env once in the master; workers inherit the environment
+load_dotenv()
+os.environ['FLASK_ENV_LOADED'] = '1'
 
 # Server socket
 bind = "0.0.0.0:8080"
 
 # Worker processes
-workers = multiprocessing.cpu_count() * 2 + 1
-worker_class = "sync"
-worker_connections = 1000
+# Threaded workers: chat/insight requests spend most of their time waiting on the
+# Anthropic API, and a waiting thread doesn't hold a whole process like a sync worker.
+# Not gevent: SQLite and the embedding model block in C, which would stall every
+# greenlet in the worker.
+workers = multiprocessing.cpu_count()
+worker_class = "gthread"
+threads = 8
 timeout = 120
 keepalive = 5
 
+# Optionally load the embedding model in the master before the workers fork, so they
+# share its weights (copy-on-write) instead of each loading a copy on its first RAG
+# request. Only the model is preloaded, not the app, so no SQLite connection crosses the fork.
+if os.environ.get('RAG_PRELOAD_MODEL', 'false').lower() == 'true':
+    def when_ready(server):
+        try:
+            from rag.vector_store import get_embedding_model
+            get_embedding_model()
+            server.log.info("Embedding model preloaded")
+        except ImportError as e:
+            server.log.warning(f"RAG module not available, embedding model not preloaded: {e}")
+
 # Logging
 accesslog = "/var/www/cashflow-optimizer/logs/access.log"
 errorlog = "/var/www/cashflow-optimizer/logs/error.log"
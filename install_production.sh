@@ -70,6 +70,11 @@ pip install --upgrade pip
 pip install -r requirements.txt
 pip install gunicorn
 
+# Stable SECRET_KEY shared by all Gunicorn workers
+if ! grep -q "^SECRET_KEY=" .env 2>/dev/null; then
+    echo "SECRET_KEY=$(python3 -c 'import secrets; print(secrets.token_hex(32))')" >> .env
+fi
+
 echo ""
 echo "Step 6: Initializing database..."
 if [ ! -f "instance/cashflow.db" ]; then
@@ -83,6 +88,15 @@ echo ""
 echo "Step 7: Running migrations..."
 python3 migrate_liquidity_status.py 2>/dev/null || echo "Migration already applied"
 python3 migrate_dual_balance.py 2>/dev/null || echo "Migration already applied"
+python3 migrate_cycle_dates.py 2>/dev/null || echo "Migration already applied"
+python3 migrate_alias_lower.py 2>/dev/null || echo "Migration already applied"
+# Not ignored on failure: it adds the unique index that blocks duplicate payments
+python3 migrate_indexes.py
+python3 migrate_idempotency_keys.py 2>/dev/null || echo "Migration already applied"
+
+# Store each card's billing cycle dates daily, right after midnight
+(crontab -l 2>/dev/null | grep -v "refresh-cycle-dates"; \
+ echo "5 0 * * * cd /var/www/cashflow-optimizer && venv/bin/flask --app app refresh-cycle-dates") | crontab -
 
 echo ""
 echo "Step 8: Creating log directory..."
@@ -0,0 +1,104 @@
+"""
+Migration script to add the normalized apple_name_lower column to CardAlias table
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+
+def migrate_alias_lower():
+    db_path = 'instance/cashflow.db'
+
+    if not os.path.exists(db_path):
+        print("❌ No database found at instance/cashflow.db")
+        return False
+
+    print("🔄 Starting alias lookup migration...")
+    print(f"   Database: {db_path}")
+
+    # Backup first
+    backup_path = f'instance/cashflow-backup-alias-lower-{datetime.now().strftime("%Y%m%d-%H%M%S")}.db'
+    import shutil
+    shutil.copy(db_path, backup_path)
+    print(f"✅ Backup created: {backup_path}")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        # Check if column already exists
+        cursor.execute("PRAGMA table_info(card_alias)")
+        columns = {row[1]: row for row in cursor.fetchall()}
+
+        if not columns:
+            print("⏭️  card_alias table not found, nothing to migrate")
+            return True
+
+        if 'apple_name_lower' in columns:
+            print("✅ apple_name_lower column already exists")
+        else:
+            print("\n📝 Adding apple_name_lower column to card_alias table...")
+            cursor.execute("ALTER TABLE card_alias ADD COLUMN apple_name_lower VARCHAR(100) NOT NULL DEFAULT ''")
+
+        # Backfill with Python's lower() so it matches what the app stores
+        print("\n📝 Filling apple_name_lower for existing aliases...")
+        cursor.execute("SELECT id, apple_name FROM card_alias ORDER BY id")
+        seen = {}
+        for alias_id, apple_name in cursor.fetchall():
+            apple_name_lower = apple_name.lower()
+            if apple_name_lower in seen:
+                raise ValueError(
+                    f'Aliases {seen[apple_name_lower]} and {alias_id} only differ in case '
+                    f'("{apple_name}"); delete one of them and run this migration again'
+                )
+            seen[apple_name_lower] = alias_id
+            cursor.execute(
+                "UPDATE card_alias SET apple_name_lower = ? WHERE id = ?",
+                (apple_name_lower, alias_id)
+            )
+        print(f"   {len(seen)} aliases updated")
+
+        # The unique index replaces the old lower(apple_name) expression index
+        cursor.execute("DROP INDEX IF EXISTS ix_cardalias_lower_apple")
+        cursor.execute(
+            "CREATE UNIQUE INDEX IF NOT EXISTS ix_card_alias_apple_name_lower "
+            "ON card_alias (apple_name_lower)"
+        )
+
+        conn.commit()
+
+        print(f"\n✅ Migration completed successfully!")
+        print(f"   Backup available at: {backup_path}")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        print(f"   Your original database is safe at: {backup_path}")
+        conn.rollback()
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🔄 Cash Flow Optimizer - Alias Lookup Migration")
+    print("=" * 60)
+    print()
+
+    success = migrate_alias_lower()
+
+    print()
+    print("=" * 60)
+
+    if success:
+        print("✅ Migration successful!")
+        print("   You can now run: ./run.sh")
+    else:
+        print("❌ Migration failed")
+        print("   Restore backup if needed:")
+        print("   cp instance/cashflow-backup-alias-lower-*.db instance/cashflow.db")
+
+    print("=" * 60)
@@ -0,0 +1,86 @@
+"""
+Migration script to add stored billing cycle date fields to Card table
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+
+CYCLE_COLUMNS = [
+    ('previous_cycle_close_date', 'DATE NULL'),
+    ('cycle_close_date', 'DATE NULL'),
+    ('previous_payment_date_cached', 'DATE NULL'),
+    ('payment_date_cached', 'DATE NULL'),
+    ('cycle_version', 'INTEGER NULL'),
+]
+
+def migrate_cycle_dates():
+    db_path = 'instance/cashflow.db'
+    
+    if not os.path.exists(db_path):
+        print("❌ No database found at instance/cashflow.db")
+        return False
+    
+    print("🔄 Starting cycle dates migration...")
+    print(f"   Database: {db_path}")
+    
+    # Backup first
+    backup_path = f'instance/cashflow-backup-cycle-dates-{datetime.now().strftime("%Y%m%d-%H%M%S")}.db'
+    import shutil
+    shutil.copy(db_path, backup_path)
+    print(f"✅ Backup created: {backup_path}")
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        # Check which cycle columns already exist
+        cursor.execute("PRAGMA table_info(card)")
+        columns = {row[1]: row for row in cursor.fetchall()}
+        
+        for column, column_type in CYCLE_COLUMNS:
+            if column in columns:
+                print(f"✅ {column} column already exists")
+                continue
+            
+            print(f"\n📝 Adding {column} column to card table...")
+            cursor.execute(f"ALTER TABLE card ADD COLUMN {column} {column_type}")
+        
+        conn.commit()
+        
+        print(f"\n✅ Migration completed successfully!")
+        print("   Dates are filled in when the app starts or by: flask --app app refresh-cycle-dates")
+        print(f"   Backup available at: {backup_path}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        print(f"   Your original database is safe at: {backup_path}")
+        conn.rollback()
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🔄 Cash Flow Optimizer - Cycle Dates Migration")
+    print("=" * 60)
+    print()
+    
+    success = migrate_cycle_dates()
+    
+    print()
+    print("=" * 60)
+    
+    if success:
+        print("✅ Migration successful!")
+        print("   You can now run: ./run.sh")
+    else:
+        print("❌ Migration failed")
+        print("   Restore backup if needed:")
+        print("   cp instance/cashflow-backup-cycle-dates-*.db instance/cashflow.db")
+    
+    print("=" * 60)
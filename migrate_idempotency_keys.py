@@ -0,0 +1,88 @@
+"""
+Migration script to add idempotency_key columns to VariableExpenseLog and CardPayment tables
+"""
+
+import sqlite3
+import os
+from datetime import datetime
+
+# (table, unique index name) - NULL keys don't collide, so existing rows need no backfill
+TABLES = [
+    ('variable_expense_log', 'ix_variable_expense_log_idempotency_key'),
+    ('card_payment', 'ix_card_payment_idempotency_key'),
+]
+
+def migrate_idempotency_keys():
+    db_path = 'instance/cashflow.db'
+
+    if not os.path.exists(db_path):
+        print("❌ No database found at instance/cashflow.db")
+        return False
+
+    print("🔄 Starting idempotency key migration...")
+    print(f"   Database: {db_path}")
+
+    # Backup first
+    backup_path = f'instance/cashflow-backup-idempotency-{datetime.now().strftime("%Y%m%d-%H%M%S")}.db'
+    import shutil
+    shutil.copy(db_path, backup_path)
+    print(f"✅ Backup created: {backup_path}")
+
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    try:
+        for table, index_name in TABLES:
+            # Check if column already exists
+            cursor.execute(f"PRAGMA table_info({table})")
+            columns = [row[1] for row in cursor.fetchall()]
+
+            if not columns:
+                print(f"⏭️  {table} table not found, skipping")
+                continue
+
+            if 'idempotency_key' in columns:
+                print(f"✅ idempotency_key column already exists in {table}")
+            else:
+                print(f"\n📝 Adding idempotency_key column to {table} table...")
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN idempotency_key VARCHAR(100)")
+
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table} (idempotency_key)")
+
+        conn.commit()
+
+        print(f"\n✅ Migration completed successfully!")
+        print(f"   Backup available at: {backup_path}")
+
+        return True
+
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        print(f"   Your original database is safe at: {backup_path}")
+        conn.rollback()
+        return False
+
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🔄 Cash Flow Optimizer - Idempotency Key Migration")
+    print("=" * 60)
+    print()
+
+    success = migrate_idempotency_keys()
+
+    print()
+    print("=" * 60)
+
+    if success:
+        print("✅ Migration successful!")
+        print("   You can now run: ./run.sh")
+    else:
+        print("❌ Migration failed")
+        print("   Restore backup if needed:")
+        print("   cp instance/cashflow-backup-idempotency-*.db instance/cashflow.db")
+
+    print("=" * 60)
@@ -0,0 +1,114 @@
+"""
+Migration script to add lookup indexes for card balances and fixed expense payments
+"""
+
+import sqlite3
+import os
+import sys
+from datetime import datetime
+
+INDEXES = [
+    ('ix_vel_card_expense_date', 'variable_expense_log', '(card_id, expense_date)'),
+    ('ix_cp_card_payment_date', 'card_payment', '(card_id, payment_date)'),
+    ('ix_vel_expense_date', 'variable_expense_log', '(expense_date)'),
+    ('ix_cp_payment_date', 'card_payment', '(payment_date)'),
+    ('ix_expensepayment_year_month', 'expense_payment', '(year, month)'),
+    # Partial index: only the pending review queue
+    ('ix_pending_apple_pay_pending', 'pending_apple_pay_expense', "(created_at) WHERE status = 'pending'"),
+]
+
+# Unique indexes: (name, table, columns); creation fails if existing rows repeat the key
+UNIQUE_INDEXES = [
+    ('ix_expensepayment_expense_year_month', 'expense_payment', '(expense_id, year, month)'),
+]
+
+def migrate_indexes():
+    db_path = 'instance/cashflow.db'
+    
+    if not os.path.exists(db_path):
+        print("❌ No database found at instance/cashflow.db")
+        return False
+    
+    print("🔄 Starting index migration...")
+    print(f"   Database: {db_path}")
+    
+    # Backup first
+    backup_path = f'instance/cashflow-backup-indexes-{datetime.now().strftime("%Y%m%d-%H%M%S")}.db'
+    import shutil
+    shutil.copy(db_path, backup_path)
+    print(f"✅ Backup created: {backup_path}")
+    
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+        tables = {row[0] for row in cursor.fetchall()}
+        
+        for index_name, table, columns in INDEXES:
+            if table not in tables:
+                print(f"⏭️  {table} table not found, skipping {index_name}")
+                continue
+            
+            print(f"\n📝 Creating {index_name} on {table} {columns}...")
+            cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} {columns}")
+        
+        for index_name, table, columns in UNIQUE_INDEXES:
+            if table not in tables:
+                print(f"⏭️  {table} table not found, skipping {index_name}")
+                continue
+            
+            cursor.execute(f"SELECT COUNT(*) FROM {table} GROUP BY {columns[1:-1]} HAVING COUNT(*) > 1")
+            duplicates = len(cursor.fetchall())
+            if duplicates:
+                raise ValueError(
+                    f'{duplicates} duplicated {columns} keys in {table}; remove the extra rows '
+                    f'and run this migration again'
+                )
+            
+            print(f"\n📝 Creating unique {index_name} on {table} {columns}...")
+            cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {index_name} ON {table} {columns}")
+        
+        # Refresh planner statistics so SQLite picks the new indexes
+        cursor.execute("ANALYZE")
+        conn.commit()
+        
+        print(f"\n✅ Migration completed successfully!")
+        print(f"   Backup available at: {backup_path}")
+        
+        return True
+        
+    except Exception as e:
+        print(f"\n❌ Error during migration: {e}")
+        print(f"   Your original database is safe at: {backup_path}")
+        conn.rollback()
+        return False
+        
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("🔄 Cash Flow Optimizer - Index Migration")
+    print("=" * 60)
+    print()
+    
+    success = migrate_indexes()
+    
+    print()
+    print("=" * 60)
+    
+    if success:
+        print("✅ Migration successful!")
+        print("   You can now run: ./run.sh")
+    else:
+        print("❌ Migration failed")
+        print("   Restore backup if needed:")
+        print("   cp instance/cashflow-backup-indexes-*.db instance/cashflow.db")
+    
+    print("=" * 60)
+    
+    # Non-zero exit so install scripts stop instead of running without the unique index
+    if not success:
+        sys.exit(1)
@@ -6,8 +6,9 @@ import os
 from pathlib import Path
 from dotenv import load_dotenv
 
-# Load environment variables from .env file
-load_dotenv()
+# Load environment variables from .env file (unless app.py/Gunicorn already did)
+if not os.environ.get('FLASK_ENV_LOADED'):
+    load_dotenv()
 
 class RAGConfig:
     """Configuration class for RAG system"""
@@ -19,6 +20,9 @@ class RAGConfig:
     DEFAULT_MODEL = "claude-3-haiku-20240307"  # Cost-effective for frequent operations
     ANALYSIS_MODEL = "claude-sonnet-4-20250514"  # For deep analysis
 
+    # Embedding model (384-dim sentence-transformers model, run on CPU)
+    EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
     # ChromaDB Configuration
     BASE_DIR = Path(__file__).parent.parent
     CHROMA_PERSIST_DIR = str(BASE_DIR / "chroma_data")
@@ -2,6 +2,7 @@
 Insight Generator - Generates responses using Claude API
 """
 
+import threading
 from typing import Dict, List, Optional, Any
 from anthropic import Anthropic
 from .config import RAGConfig
@@ -27,9 +28,10 @@ class InsightGenerator:
         else:
             self.client = None
 
-        # Usage tracking
+        # Usage tracking (insights can run on several threads at once)
         self.total_input_tokens = 0
         self.total_output_tokens = 0
+        self._usage_lock = threading.Lock()
 
     def is_available(self) -> bool:
         """Check if the generator is properly configured"""
@@ -102,8 +104,7 @@ class InsightGenerator:
             )
 
             # Track usage
-            self.total_input_tokens += response.usage.input_tokens
-            self.total_output_tokens += response.usage.output_tokens
+            self._track_usage(response.usage)
 
             return {
                 'text': response.content[0].text,
@@ -245,6 +246,12 @@ class InsightGenerator:
             anomalies=anomalies
         )
 
+    def _track_usage(self, usage):
+        """Add a response's token counts to the cumulative totals"""
+        with self._usage_lock:
+            self.total_input_tokens += usage.input_tokens
+            self.total_output_tokens += usage.output_tokens
+
     def get_usage_stats(self) -> Dict[str, Any]:
         """Get cumulative usage statistics"""
         # Approximate cost calculation (based on Claude 3 Haiku pricing)
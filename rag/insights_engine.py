@@ -19,6 +19,9 @@ class InsightsEngine:
     This version doesn't query SQLAlchemy directly - data must be passed in.
     """
 
+    # Expenses embedded per encode call when indexing in batch
+    INDEX_BATCH_SIZE = 256
+
     def __init__(self):
         """Initialize the insights engine"""
         self.vector_store = FinancialVectorStore()
@@ -78,20 +81,25 @@ class InsightsEngine:
         """
         indexed = 0
         errors = 0
+        docs = []
 
         for expense in expenses:
             try:
-                doc = self.document_processor.process_variable_expense(expense)
-                self.vector_store.add_expense(
-                    expense_id=doc['id'],
-                    text=doc['text'],
-                    metadata=doc['metadata']
-                )
-                indexed += 1
+                docs.append(self.document_processor.process_variable_expense(expense))
             except Exception as e:
                 print(f"Error indexing expense {expense.id}: {e}")
                 errors += 1
 
+        # Embed and persist in chunks instead of once per expense
+        for start in range(0, len(docs), self.INDEX_BATCH_SIZE):
+            batch = docs[start:start + self.INDEX_BATCH_SIZE]
+            try:
+                self.vector_store.add_expenses_batch(batch)
+                indexed += len(batch)
+            except Exception as e:
+                print(f"Error indexing expense batch: {e}")
+                errors += len(batch)
+
         return {'indexed': indexed, 'errors': errors}
 
     def update_monthly_summary(
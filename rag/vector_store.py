@@ -3,14 +3,31 @@ Vector Store - Simple vector storage using sentence-transformers and numpy
 Compatible with Python 3.14 without ChromaDB
 """
 
-import json
+import hashlib
 import os
+import threading
+from collections import OrderedDict
 import numpy as np
+import orjson
 from typing import List, Dict, Optional, Any
 from pathlib import Path
 from sentence_transformers import SentenceTransformer
 from .config import RAGConfig
 
+# One embedding model per process, shared by every vector store instance
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+
+def get_embedding_model() -> SentenceTransformer:
+    """Load the embedding model once per process (Gunicorn can preload it before forking)"""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = SentenceTransformer(RAGConfig.EMBEDDING_MODEL, device='cpu')
+    return _embedding_model
+
 
 class FinancialVectorStore:
     """
@@ -18,13 +35,17 @@ class FinancialVectorStore:
     Stores vectors in JSON files for persistence.
     """
 
+    # Recent query embeddings kept in memory (one search usually hits all three collections)
+    QUERY_CACHE_SIZE = 1024
+
     def __init__(self, persist_directory: str = None):
         """Initialize vector store with persistence"""
         self.persist_dir = Path(persist_directory or RAGConfig.CHROMA_PERSIST_DIR)
         self.persist_dir.mkdir(parents=True, exist_ok=True)
 
-        # Initialize sentence transformer model
-        self._model = None
+        # LRU of query embeddings keyed by the SHA-256 of the query text
+        self._query_embeddings = OrderedDict()
+        self._query_embeddings_lock = threading.Lock()
 
         # Collections storage
         self.collections = {
@@ -39,9 +60,24 @@ class FinancialVectorStore:
     @property
     def model(self):
         """Lazy load the embedding model"""
-        if self._model is None:
-            self._model = SentenceTransformer('all-MiniLM-L6-v2')
-        return self._model
+        return get_embedding_model()
+
+    def _embed_query(self, query: str) -> np.ndarray:
+        """Embedding of a search query, reusing it if the same text was embedded recently"""
+        key = hashlib.sha256(query.encode('utf-8')).hexdigest()
+        with self._query_embeddings_lock:
+            embedding = self._query_embeddings.get(key)
+            if embedding is not None:
+                self._query_embeddings.move_to_end(key)
+                return embedding
+
+        embedding = self.model.encode(query)
+
+        with self._query_embeddings_lock:
+            self._query_embeddings[key] = embedding
+            if len(self._query_embeddings) > self.QUERY_CACHE_SIZE:
+                self._query_embeddings.popitem(last=False)
+        return embedding
 
     def _get_collection_path(self, name: str) -> Path:
         """Get path for collection file"""
@@ -51,8 +87,8 @@ class FinancialVectorStore:
         """Load collection from disk"""
         path = self._get_collection_path(name)
         if path.exists():
-            with open(path, 'r') as f:
-                data = json.load(f)
+            with open(path, 'rb') as f:
+                data = orjson.loads(f.read())
                 self.collections[name] = {
                     'documents': data.get('documents', []),
                     'embeddings': [np.array(e) for e in data.get('embeddings', [])],
@@ -65,12 +101,13 @@ class FinancialVectorStore:
         path = self._get_collection_path(name)
         data = {
             'documents': self.collections[name]['documents'],
-            'embeddings': [e.tolist() for e in self.collections[name]['embeddings']],
+            # orjson writes the numpy arrays directly, without converting each to a list
+            'embeddings': self.collections[name]['embeddings'],
             'metadatas': self.collections[name]['metadatas'],
             'ids': self.collections[name]['ids']
         }
-        with open(path, 'w') as f:
-            json.dump(data, f)
+        with open(path, 'wb') as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY))
 
     def _load_all(self):
         """Load all collections"""
@@ -82,10 +119,6 @@ class FinancialVectorStore:
         for name in self.collections:
             self._save_collection(name)
 
-    def _cosine_similarity(self, a: np.ndarray, b: np.ndarray) -> float:
-        """Calculate cosine similarity between two vectors"""
-        return np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b))
-
     def _add_document(self, collection: str, doc_id: str, text: str, metadata: Dict):
         """Add or update a document in a collection"""
         col = self.collections[collection]
@@ -108,6 +141,30 @@ class FinancialVectorStore:
         # Persist
         self._save_collection(collection)
 
+    def _add_documents(self, collection: str, doc_ids: List[str], texts: List[str], metadatas: List[Dict]):
+        """Add or update several documents with one encode call and one save"""
+        col = self.collections[collection]
+
+        # Encode the whole batch in one forward pass
+        embeddings = self.model.encode(texts, batch_size=64)
+
+        positions = {doc_id: idx for idx, doc_id in enumerate(col['ids'])}
+        for doc_id, text, embedding, metadata in zip(doc_ids, texts, embeddings, metadatas):
+            idx = positions.get(doc_id)
+            if idx is not None:
+                col['documents'][idx] = text
+                col['embeddings'][idx] = embedding
+                col['metadatas'][idx] = metadata
+            else:
+                positions[doc_id] = len(col['ids'])
+                col['ids'].append(doc_id)
+                col['documents'].append(text)
+                col['embeddings'].append(embedding)
+                col['metadatas'].append(metadata)
+
+        # Persist
+        self._save_collection(collection)
+
     def _query_collection(
         self,
         collection: str,
@@ -121,27 +178,29 @@ class FinancialVectorStore:
         if not col['documents']:
             return {'documents': [[]], 'metadatas': [[]], 'ids': [[]], 'distances': [[]]}
 
-        # Generate query embedding
-        query_embedding = self.model.encode(query)
+        # Generate query embedding (cached across collections and requests)
+        query_embedding = self._embed_query(query)
 
-        # Calculate similarities
-        similarities = []
-        for i, emb in enumerate(col['embeddings']):
-            # Apply metadata filter if specified
-            if where:
-                meta = col['metadatas'][i]
-                match = all(meta.get(k) == v for k, v in where.items())
-                if not match:
-                    continue
-
-            sim = self._cosine_similarity(query_embedding, emb)
-            similarities.append((i, sim))
+        # Apply metadata filter if specified
+        if where:
+            indices = [
+                i for i, meta in enumerate(col['metadatas'])
+                if all(meta.get(k) == v for k, v in where.items())
+            ]
+        else:
+            indices = list(range(len(col['embeddings'])))
 
-        # Sort by similarity (descending)
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        top_results = []
+        if indices:
+            # Cosine similarity against every candidate in one matrix-vector product
+            matrix = np.vstack([col['embeddings'][i] for i in indices])
+            sims = matrix @ query_embedding / (
+                np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_embedding)
+            )
 
-        # Get top results
-        top_results = similarities[:n_results]
+            # Top results by similarity (descending, ties keep insertion order)
+            order = np.argsort(-sims, kind='stable')[:n_results]
+            top_results = [(indices[j], sims[j]) for j in order]
 
         documents = []
         metadatas = []
@@ -170,9 +229,14 @@ class FinancialVectorStore:
 
     def add_expenses_batch(self, expenses: List[Dict]) -> None:
         """Add multiple expense documents in batch"""
-        for e in expenses:
-            doc_id = f"expense_{e['id']}"
-            self._add_document('expenses', doc_id, e['text'], e['metadata'])
+        if not expenses:
+            return
+        self._add_documents(
+            'expenses',
+            [f"expense_{e['id']}" for e in expenses],
+            [e['text'] for e in expenses],
+            [e['metadata'] for e in expenses]
+        )
 
     def add_summary(self, month: str, text: str, metadata: Dict[str, Any]) -> None:
         """Add or update a monthly summary"""
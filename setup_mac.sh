@@ -30,6 +30,19 @@ source venv/bin/activate
 echo -e "${BLUE}📦 Paso 3/4:${NC} Instalando dependencias..."
 pip install -r requirements.txt
 
+# SECRET_KEY estable para que todas las sesiones usen la misma llave
+if ! grep -q "^SECRET_KEY=" .env 2>/dev/null; then
+    echo "SECRET_KEY=$(python3 -c 'import secrets; print(secrets.token_hex(32))')" >> .env
+fi
+
+# Base de datos existente: agregar los índices nuevos (incluye el único de pagos fijos)
+if [ -f "instance/cashflow.db" ]; then
+    if ! python3 migrate_indexes.py; then
+        echo "❌ Error: la migración de índices falló; revisa los pagos duplicados indicados arriba"
+        exit 1
+    fi
+fi
+
 echo -e "${BLUE}📦 Paso 4/4:${NC} Verificando instalación..."
 python3 --version
 echo ""
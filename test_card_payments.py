@@ -25,14 +25,12 @@ with app.app_context():
         
         if closed_statement:
             balance = closed_statement.get('balance', 0)
-            payment_date_str = closed_statement.get('payment_date')
+            pmt_date = closed_statement.get('payment_date')
             print(f"  Balance: ${balance:,.2f}")
-            print(f"  Payment date string: {payment_date_str}")
+            print(f"  Payment date: {pmt_date}")
             
-            if balance > 0 and payment_date_str:
-                pmt_date = datetime.fromisoformat(payment_date_str).date()
+            if balance > 0 and pmt_date:
                 days_until = (pmt_date - purchase_date.date()).days
-                print(f"  Payment date parsed: {pmt_date}")
                 print(f"  Days until payment: {days_until}")
                 
                 if 0 <= days_until <= 30:
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Query budget test: hot endpoints must not run more SQL statements than
+QUERY_BUDGETS allows (catches N+1 regressions).
+
+Runs against a throwaway database: python3 test_query_budget.py
+"""
+import os
+import tempfile
+import threading
+import unittest
+from contextlib import contextmanager
+
+# Point the app at an empty instance folder before it creates its tables
+os.environ['CASHFLOW_INSTANCE_PATH'] = tempfile.mkdtemp(prefix='cashflow-test-')
+os.environ.setdefault('SECRET_KEY', 'test-secret')
+os.environ['APPLE_PAY_API_KEY'] = 'test-key'
+
+from sqlalchemy import event
+
+from app import (app, db, QUERY_BUDGETS, Account, Card, IncomeSchedule,
+                 SavingsAccount, SavingsGoal, VariableExpenseLog)
+
+
+@contextmanager
+def count_queries():
+    """Collect the SQL statements this thread runs on any engine (writer and read bind)"""
+    statements = []
+    thread_id = threading.get_ident()
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        # The background RAG indexer runs on its own thread; it is not part of the request
+        if threading.get_ident() == thread_id:
+            statements.append(statement)
+
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        for engine in engines:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+class QueryBudgetTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        with app.app_context():
+            db.session.add_all([
+                Account(balance=5000),
+                IncomeSchedule(amount=3300, first_paycheck_day=9, second_paycheck_day=23),
+                SavingsGoal(amount_per_paycheck=500, min_balance_comfort=2000,
+                            variable_expenses_monthly=240),
+                SavingsAccount(balance=7000, target=15000),
+                Card(name='Amex', closing_day=5, payment_due_day=28, credit_limit=5000),
+                Card(name='Visa', closing_day=20, payment_due_day=10, credit_limit=3000),
+            ])
+            db.session.flush()
+            cards = Card.query.all()
+            # Expenses on several cards, so a per-card lookup would show up as extra queries
+            for i in range(6):
+                db.session.add(VariableExpenseLog(category='Comida', amount=10 + i,
+                                                  description=f'Gasto {i}',
+                                                  card_id=cards[i % 2].id if i % 3 else None))
+            db.session.commit()
+        cls.client = app.test_client()
+
+    def apple_pay(self, **fields):
+        return self.client.post('/api/expenses/apple-pay',
+                                json={'api_key': 'test-key', 'merchant': 'Starbucks', **fields})
+
+    def assertWithinBudget(self, statements, budget, label):
+        self.assertLessEqual(len(statements), budget,
+                             f'{label} ran {len(statements)} SQL statements (budget {budget}):\n'
+                             + '\n'.join(statements))
+
+    def test_expenses_this_month(self):
+        with count_queries() as statements:
+            response = self.client.get('/api/expenses/this-month')
+        self.assertEqual(response.status_code, 200)
+        self.assertWithinBudget(statements, QUERY_BUDGETS['get_expenses_this_month'],
+                                'get_expenses_this_month')
+
+    def test_apple_pay_card_expense(self):
+        # The first card match loads the alias and card-name caches once per process;
+        # the budget covers the steady state
+        self.assertEqual(self.apple_pay(amount=1, card_name='Amex').status_code, 201)
+
+        with count_queries() as statements:
+            response = self.apple_pay(amount=12.5, card_name='amex')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.get_json()['match_type'], 'exact')
+        # 5 is the floor for a card charge: BEGIN IMMEDIATE (@locks_balances), the
+        # matched card row, then one write each for the card balance, the expense and
+        # the checking account's last_updated (an UPDATE ... RETURNING the balance)
+        self.assertWithinBudget(statements, QUERY_BUDGETS['add_apple_pay_expense'],
+                                'add_apple_pay_expense (card)')
+
+    def test_apple_pay_cash_expense(self):
+        with count_queries() as statements:
+            response = self.apple_pay(amount=3)
+        self.assertEqual(response.status_code, 201)
+        # BEGIN IMMEDIATE, the account row, its balance update and the expense insert
+        self.assertWithinBudget(statements, 4, 'add_apple_pay_expense (cash)')
+
+
+if __name__ == '__main__':
+    unittest.main()